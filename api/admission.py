@@ -0,0 +1,188 @@
+import math
+import threading
+import time
+
+# Requests per second and burst size for each user
+RATE_LIMITS = {
+    'admin': (50.0, 100),
+    'user': (10.0, 20),
+    'test': (10.0, 20)
+}
+
+# Used for users without an entry in RATE_LIMITS
+DEFAULT_RATE_LIMIT = (10.0, 20)
+
+# Requests processed at once before new ones are shed with 503
+MAX_IN_FLIGHT = 64
+
+def parse_rate_limits(value):
+    """
+    Parse per-user limits from a string like "admin=50:100,user=5:10"
+
+    Args:
+        value: Comma-separated user=rate:burst entries
+
+    Returns:
+        Dictionary {username: (rate, burst)}
+    """
+    limits = {}
+
+    for entry in value.split(','):
+        if not entry.strip():
+            continue
+        username, limit = entry.split('=', 1)
+        rate, burst = limit.split(':', 1)
+        limits[username.strip()] = (float(rate), int(burst))
+
+    return limits
+
+class TokenBucket:
+    """Token bucket refilled continuously at `rate` tokens per second"""
+
+    def __init__(self, rate, burst):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = float(burst)
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def consume(self):
+        """
+        Take one token
+
+        Returns:
+            0 if a token was available, otherwise seconds until one will be
+        """
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.burst, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+
+            if self.tokens >= 1:
+                self.tokens -= 1
+                return 0
+
+            return (1 - self.tokens) / self.rate if self.rate > 0 else float('inf')
+
+class AdmissionController:
+    """
+    Per-user rate limiting and overload shedding
+
+    Tracks how many requests are being processed and keeps one token
+    bucket per user, along with counters for monitoring.
+    """
+
+    def __init__(self, limits=None, default_limit=DEFAULT_RATE_LIMIT, max_in_flight=MAX_IN_FLIGHT):
+        self.limits = dict(RATE_LIMITS if limits is None else limits)
+        self.default_limit = default_limit
+        self.max_in_flight = max_in_flight
+        self.workers = 1
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+        self.in_flight = 0
+        self.peak_in_flight = 0
+        self.shed = 0
+        self.users = {}
+
+    def split(self, workers):
+        """
+        Divide the limits evenly between pre-forked worker processes
+
+        Every worker admits requests on its own, so without this each user
+        would get `workers` times the configured rate and burst. The kernel
+        spreads connections over the workers, so the combined limits are
+        approximately the configured ones. Call before any bucket exists.
+
+        Args:
+            workers: Number of worker processes
+        """
+        def share(limit):
+            rate, burst = limit
+            return (rate / workers, max(1, math.ceil(burst / workers)))
+
+        with self.lock:
+            self.limits = {username: share(limit) for username, limit in self.limits.items()}
+            self.default_limit = share(self.default_limit)
+            self.max_in_flight = max(1, math.ceil(self.max_in_flight / workers))
+            self.workers = workers
+
+    def user_counters(self, username):
+        """Counters for one user (caller holds self.lock)"""
+        if username not in self.users:
+            self.users[username] = {'allowed': 0, 'rate_limited': 0}
+        return self.users[username]
+
+    def enter(self):
+        """
+        Count a request as in flight, unless the server is overloaded
+
+        Returns:
+            True if admitted (call leave() when done), False if shed
+        """
+        with self.lock:
+            if self.in_flight >= self.max_in_flight:
+                self.shed += 1
+                return False
+
+            self.in_flight += 1
+            self.peak_in_flight = max(self.peak_in_flight, self.in_flight)
+            return True
+
+    def leave(self):
+        """Mark an admitted request as finished"""
+        with self.lock:
+            self.in_flight -= 1
+
+    def consume(self, username):
+        """
+        Charge one request to a user's token bucket
+
+        Returns:
+            0 if allowed, otherwise seconds the user should wait
+        """
+        with self.lock:
+            bucket = self.buckets.get(username)
+            if bucket is None:
+                rate, burst = self.limits.get(username, self.default_limit)
+                bucket = self.buckets[username] = TokenBucket(rate, burst)
+
+        retry_after = bucket.consume()
+
+        with self.lock:
+            counters = self.user_counters(username)
+            if retry_after:
+                counters['rate_limited'] += 1
+            else:
+                counters['allowed'] += 1
+
+        return retry_after
+
+    def stats(self):
+        """
+        Snapshot of the counters
+
+        Returns:
+            Dictionary suitable for a JSON response
+        """
+        with self.lock:
+            return {
+                'workers': self.workers,
+                'in_flight': self.in_flight,
+                'peak_in_flight': self.peak_in_flight,
+                'max_in_flight': self.max_in_flight,
+                'shed': self.shed,
+                'users': {
+                    username: {
+                        'allowed': counters['allowed'],
+                        'rate_limited': counters['rate_limited'],
+                        'rate': self.limits.get(username, self.default_limit)[0],
+                        'burst': self.limits.get(username, self.default_limit)[1]
+                    }
+                    for username, counters in self.users.items()
+                }
+            }
+
+def retry_after_header(seconds):
+    """Format a Retry-After value (whole seconds, at least 1)"""
+    return str(max(1, math.ceil(min(seconds, 3600))))
@@ -64,12 +64,27 @@ def authenticate(auth_header):
     Returns:
         True if authenticated, False otherwise
     """
+    return get_authenticated_user(auth_header) is not None
+
+def get_authenticated_user(auth_header):
+    """
+    Authenticate request using Basic Auth and identify the user
+    
+    Args:
+        auth_header: Authorization header value
+    
+    Returns:
+        Username if authenticated, None otherwise
+    """
     username, password = parse_auth_header(auth_header)
     
     if username is None or password is None:
-        return False
+        return None
+    
+    if not validate_credentials(username, password):
+        return None
     
-    return validate_credentials(username, password)
+    return username
 
 def get_auth_response_headers():
     """
@@ -0,0 +1,81 @@
+import threading
+import time
+
+class LoadState:
+    """
+    Progress of the background dataset load
+
+    The server starts accepting connections before the dataset is loaded.
+    Handlers consult this to answer /healthz and /readyz and to turn data
+    requests away until loading has finished.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.status = 'starting'
+        self.phase = None
+        self.records = 0
+        self.error = None
+        self.started = None
+        self.finished = None
+
+    @property
+    def ready(self):
+        return self.status == 'ready'
+
+    @property
+    def failed(self):
+        return self.status == 'failed'
+
+    def begin(self):
+        """Mark the start of the load; elapsed time is counted from here"""
+        with self.lock:
+            self.status = 'loading'
+            self.started = time.monotonic()
+    
+    def update(self, phase, records=None):
+        """
+        Record the step the load is on
+
+        Args:
+            phase: Short description, e.g. "parsing XML"
+            records: Number of records known so far, if any
+        """
+        with self.lock:
+            self.status = 'loading'
+            self.phase = phase
+            if records is not None:
+                self.records = records
+
+    def finish(self, records):
+        """Mark the dataset as loaded"""
+        with self.lock:
+            self.status = 'ready'
+            self.phase = None
+            self.records = records
+            self.finished = time.monotonic()
+
+    def fail(self, error):
+        """Mark the load as failed; the server will never become ready"""
+        with self.lock:
+            self.status = 'failed'
+            self.error = str(error)
+            self.finished = time.monotonic()
+
+    def stats(self):
+        """
+        Snapshot of the load progress
+
+        Returns:
+            Dictionary suitable for a JSON response
+        """
+        with self.lock:
+            end = self.finished if self.finished is not None else time.monotonic()
+            elapsed = end - self.started if self.started is not None else 0
+            return {
+                'status': self.status,
+                'phase': self.phase,
+                'records': self.records,
+                'elapsed_seconds': round(elapsed, 3),
+                'error': self.error
+            }
@@ -0,0 +1,385 @@
+import gc
+import os
+import signal
+import socket
+import threading
+from io import BytesIO
+from http.server import ThreadingHTTPServer
+from multiprocessing import Pipe
+from multiprocessing.connection import wait
+
+class ReusePortHTTPServer(ThreadingHTTPServer):
+    """
+    ThreadingHTTPServer that binds with SO_REUSEPORT so several processes can accept on one port
+
+    Request threads are tracked, so the parent can wait for them to finish
+    before it forks the workers.
+    """
+
+    # Request threads are joined by join_requests(), not abandoned
+    daemon_threads = False
+
+    # Set while the parent hands its socket over to the workers
+    handing_off = False
+
+    def __init__(self, *args, **kwargs):
+        self.request_threads = []
+        self.request_threads_lock = threading.Lock()
+        super().__init__(*args, **kwargs)
+
+    def server_bind(self):
+        self.socket.setsockopt(socket.SOL_SOCKET, socket.SO_REUSEPORT, 1)
+        super().server_bind()
+
+    def process_request(self, request, client_address):
+        """Handle the request on a new, tracked thread"""
+        thread = threading.Thread(target=self.process_request_thread, args=(request, client_address))
+        thread.daemon = self.daemon_threads
+
+        with self.request_threads_lock:
+            self.request_threads = [t for t in self.request_threads if t.is_alive()]
+            self.request_threads.append(thread)
+
+        thread.start()
+
+    def join_requests(self):
+        """Wait until every request thread has finished"""
+        with self.request_threads_lock:
+            threads = list(self.request_threads)
+
+        for thread in threads:
+            thread.join()
+
+def hand_off(server):
+    """
+    Serve the connections already queued on the parent's socket, then close it
+
+    Called once every worker is listening, so new connections go to the
+    workers; connections the kernel queued on the parent's socket in the
+    meantime are still answered instead of being reset.
+
+    Args:
+        server: The parent's stopped ReusePortHTTPServer
+    """
+    server.handing_off = True
+    server.socket.setblocking(False)
+
+    while True:
+        try:
+            request, client_address = server.socket.accept()
+        except (BlockingIOError, InterruptedError):
+            break
+        request.setblocking(True)
+        server.process_request(request, client_address)
+
+    server.server_close()
+    server.join_requests()
+
+def make_replay_handler(handler_class):
+    """
+    Build a handler class that runs a request without a socket
+
+    The owner process uses it to execute forwarded writes, and every
+    worker uses it to replay the same writes on its own copy of the data.
+
+    Args:
+        handler_class: Request handler class used by the server
+
+    Returns:
+        ReplayHandler class
+    """
+    class ReplayHandler(handler_class):
+        def __init__(self, method, path, headers, body):
+            self.command = method
+            self.path = path
+            self.headers = headers
+            self.rfile = BytesIO(body)
+            self.wfile = BytesIO()
+            self.request_version = 'HTTP/1.1'
+            self.requestline = f'{method} {path} HTTP/1.1'
+            self.client_address = ('prefork-owner', 0)
+            # Not attached to a listening server (so never handing off)
+            self.server = None
+            self.status = None
+
+        def send_response(self, code, message=None):
+            self.status = code
+            super().send_response(code, message)
+
+        def log_message(self, format, *args):
+            """Replayed requests are logged by the worker that received them"""
+            pass
+
+        def admit(self):
+            """Admission control already ran in the worker that received the request"""
+            return True
+
+        def run(self):
+            """
+            Execute the request
+
+            Returns:
+                Tuple (status_code, raw_response_bytes)
+            """
+            getattr(self, 'do_' + self.command)()
+            return self.status, self.wfile.getvalue()
+
+    return ReplayHandler
+
+class WorkerState:
+    """Shared state between a worker's request thread and its replication thread"""
+
+    def __init__(self, request_conn):
+        self.request_conn = request_conn
+        self.request_lock = threading.Lock()
+        # Signals replication progress; reads use the store's snapshots and need no lock
+        self.lock = threading.Condition()
+        self.applied_seq = 0
+
+    def forward(self, op):
+        """
+        Send a write to the owner process and wait for its answer
+
+        Returns:
+            Tuple (status_code, seq, raw_response_bytes)
+        """
+        with self.request_lock:
+            self.request_conn.send(op)
+            return self.request_conn.recv()
+
+    def wait_applied(self, seq):
+        """Block until this worker has replayed every write up to seq"""
+        with self.lock:
+            self.lock.wait_for(lambda: self.applied_seq >= seq)
+
+def make_worker_handler(handler_class, state):
+    """
+    Build the handler class served by a worker process
+
+    Reads run against the worker's copy of the dataset; writes are
+    forwarded to the owner process. POST/DELETE requests that do not
+    change the dataset (see is_local_request) are handled locally.
+
+    Args:
+        handler_class: Request handler class used by the server
+        state: WorkerState of this worker
+
+    Returns:
+        WorkerHandler class
+    """
+    class WorkerHandler(handler_class):
+        def do_POST(self):
+            if self.is_local_request():
+                super().do_POST()
+            else:
+                self.forward_write()
+
+        def do_PUT(self):
+            self.forward_write()
+
+        def do_DELETE(self):
+            if self.is_local_request():
+                super().do_DELETE()
+            else:
+                self.forward_write()
+
+        def forward_write(self):
+            """Forward a POST/PUT/DELETE to the owner and relay its response"""
+            # Rate limits apply in the worker; the owner only applies writes
+            if not self.check_auth() or not self.admit():
+                return
+
+            content_length = int(self.headers.get('Content-Length', 0))
+            body = self.rfile.read(content_length)
+            headers = {'Content-Length': str(len(body))}
+            if self.headers.get('Authorization') is not None:
+                headers['Authorization'] = self.headers.get('Authorization')
+
+            status, seq, raw = state.forward((self.command, self.path, headers, body))
+
+            # Make our own write visible to our next read
+            state.wait_applied(seq)
+
+            self.log_request(status)
+            self.wfile.write(raw)
+
+    return WorkerHandler
+
+def apply_events(state, replay_class, event_conn):
+    """
+    Replay writes published by the owner, in order
+
+    Args:
+        state: WorkerState of this worker
+        replay_class: Handler class from make_replay_handler
+        event_conn: Read end of the owner's event pipe
+    """
+    while True:
+        try:
+            seq, op = event_conn.recv()
+        except EOFError:
+            return
+
+        with state.lock:
+            replay_class(*op).run()
+            state.applied_seq = seq
+            state.lock.notify_all()
+
+def run_worker(handler_class, replay_class, host, port, request_conn, event_conn, ready_conn):
+    """Serve HTTP in a forked worker process"""
+    state = WorkerState(request_conn)
+
+    thread = threading.Thread(target=apply_events, args=(state, replay_class, event_conn), daemon=True)
+    thread.start()
+
+    httpd = ReusePortHTTPServer((host, port), make_worker_handler(handler_class, state))
+
+    # Tell the parent we are listening
+    ready_conn.send(os.getpid())
+    ready_conn.close()
+
+    try:
+        httpd.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        httpd.server_close()
+
+def run_owner(replay_class, request_conns, event_conns, replicate=True):
+    """
+    Apply forwarded writes one at a time and publish them to all workers
+
+    Only successful writes are published. Each worker replays them through
+    the same handlers, so every copy of the dataset stays identical.
+
+    Args:
+        replay_class: Handler class from make_replay_handler
+        request_conns: Owner ends of the workers' request pipes
+        event_conns: Write ends of the workers' event pipes
+        replicate: False when storage is shared between processes, so
+            writes are only applied once, by the owner
+    """
+    seq = 0
+
+    while request_conns:
+        for conn in wait(request_conns):
+            try:
+                op = conn.recv()
+            except EOFError:
+                request_conns.remove(conn)
+                continue
+
+            status, raw = replay_class(*op).run()
+
+            if replicate and status is not None and 200 <= status < 300:
+                seq += 1
+                for event_conn in list(event_conns):
+                    try:
+                        event_conn.send((seq, op))
+                    except OSError:
+                        event_conns.remove(event_conn)
+
+            try:
+                conn.send((status, seq, raw))
+            except OSError:
+                request_conns.remove(conn)
+
+def stop_owner(signum, frame):
+    """SIGTERM handler for the owner process"""
+    raise KeyboardInterrupt
+
+def run_prefork_server(handler_class, host, port, workers, replicate=True, startup_server=None):
+    """
+    Fork worker processes that share the already-loaded dataset
+
+    The dataset must be loaded before calling this, so the workers inherit
+    it copy-on-write instead of parsing the XML again. The parent process
+    does not serve HTTP once the workers are listening; it owns all writes.
+
+    Args:
+        handler_class: Request handler class used by the server
+        host: Server host
+        port: Server port
+        workers: Number of worker processes
+        replicate: Replay writes on every worker's copy of the data
+        startup_server: The parent's ReusePortHTTPServer that answered
+            requests while the dataset loaded. It must be stopped, with no
+            request threads left; its socket stays open until every worker
+            is listening, so the port is never without a listener.
+    """
+    if not hasattr(os, 'fork') or not hasattr(socket, 'SO_REUSEPORT'):
+        raise RuntimeError("Pre-fork mode requires os.fork and SO_REUSEPORT")
+
+    replay_class = make_replay_handler(handler_class)
+
+    # Move everything allocated so far (the dataset) out of the collector's
+    # reach, so garbage collections in the workers do not write to - and so
+    # copy - the pages they share with the parent. Collection stays off
+    # until every worker is forked.
+    gc.disable()
+    gc.freeze()
+
+    request_conns = []
+    event_conns = []
+    ready_conns = []
+    pids = []
+
+    for _ in range(workers):
+        owner_request, worker_request = Pipe()
+        worker_event, owner_event = Pipe(duplex=False)
+        owner_ready, worker_ready = Pipe(duplex=False)
+
+        pid = os.fork()
+        if pid == 0:
+            # Child: drop every owner-side connection and socket it inherited
+            exit_code = 1
+            try:
+                gc.enable()
+                for conn in request_conns + event_conns + ready_conns + [owner_request, owner_event, owner_ready]:
+                    conn.close()
+                if startup_server is not None:
+                    startup_server.socket.close()
+                run_worker(handler_class, replay_class, host, port, worker_request, worker_event, worker_ready)
+                exit_code = 0
+            finally:
+                os._exit(exit_code)
+
+        worker_request.close()
+        worker_event.close()
+        worker_ready.close()
+        request_conns.append(owner_request)
+        event_conns.append(owner_event)
+        ready_conns.append(owner_ready)
+        pids.append(pid)
+
+    gc.enable()
+
+    # Wait until every worker is listening (EOF means it failed to start)
+    for conn in ready_conns:
+        try:
+            conn.recv()
+        except EOFError:
+            pass
+        conn.close()
+
+    if startup_server is not None:
+        hand_off(startup_server)
+
+    print(f"Started {workers} worker processes: {', '.join(str(pid) for pid in pids)}")
+
+    # Let orchestrators stop the whole group by signalling the owner
+    signal.signal(signal.SIGTERM, stop_owner)
+
+    try:
+        run_owner(replay_class, request_conns, event_conns, replicate)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        for conn in request_conns + event_conns:
+            conn.close()
+        for pid in pids:
+            try:
+                os.kill(pid, signal.SIGTERM)
+            except ProcessLookupError:
+                pass
+            os.waitpid(pid, 0)
@@ -0,0 +1,250 @@
+import os
+import random
+import re
+import threading
+import time
+import tracemalloc
+from urllib.parse import urlsplit
+
+# Stack depth recorded for each traced allocation
+TRACEMALLOC_FRAMES = 10
+
+def route_key(method, path):
+    """
+    Name the route a request belongs to, e.g. "GET /transactions/{id}"
+
+    Args:
+        method: HTTP method
+        path: Request path (query string is ignored)
+
+    Returns:
+        Route string
+    """
+    path = re.sub(r'/\d+(?=/|$)', '/{id}', urlsplit(path).path)
+    return f"{method} {path}"
+
+class Profiler:
+    """
+    Opt-in request profiler
+
+    While a profiling window is open, a sample of requests (optionally only
+    those of one route) is run under cProfile and the results are merged
+    into one set of statistics. tracemalloc records allocations for the
+    whole process during the window. When no window is open the only cost
+    per request is reading `active`.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        # cProfile can only profile one request at a time on newer Pythons
+        self.profile_lock = threading.Lock()
+        self.active = False
+        self.timer = None
+        self.reset()
+
+    def reset(self):
+        """Clear collected data (caller holds self.lock or is __init__)"""
+        self.started_at = None
+        self.deadline = None
+        self.sample_rate = 1.0
+        self.route = None
+        self.requests_seen = 0
+        self.requests_profiled = 0
+        self.stats = None
+        self.routes = {}
+        self.trace_allocations = False
+        self.started_tracemalloc = False
+        self.baseline = None
+        self.final = None
+
+    def start(self, seconds, sample_rate=1.0, route=None, trace_allocations=True):
+        """
+        Open a profiling window, discarding data from any earlier window
+
+        Args:
+            seconds: Length of the window
+            sample_rate: Fraction of matching requests to profile (0-1)
+            route: Only profile this route (see route_key), or None for all
+            trace_allocations: Also record allocations with tracemalloc
+        """
+        self.stop()
+
+        with self.lock:
+            self.reset()
+            self.started_at = time.time()
+            self.deadline = time.monotonic() + seconds
+            self.sample_rate = sample_rate
+            self.route = route
+            self.trace_allocations = trace_allocations
+
+            if trace_allocations:
+                if not tracemalloc.is_tracing():
+                    tracemalloc.start(TRACEMALLOC_FRAMES)
+                    self.started_tracemalloc = True
+                self.baseline = tracemalloc.take_snapshot()
+
+            self.timer = threading.Timer(seconds, self.stop)
+            self.timer.daemon = True
+            self.timer.start()
+            self.active = True
+
+    def stop(self):
+        """Close the profiling window, keeping the collected data for reports"""
+        with self.lock:
+            if not self.active:
+                return
+            self.active = False
+
+            if self.timer is not None:
+                self.timer.cancel()
+                self.timer = None
+
+            if self.trace_allocations and tracemalloc.is_tracing():
+                self.final = tracemalloc.take_snapshot()
+                if self.started_tracemalloc:
+                    tracemalloc.stop()
+
+    def run(self, method, path, func):
+        """
+        Run a request, profiling it if it is sampled
+
+        Args:
+            method: HTTP method
+            path: Request path
+            func: Callable that handles the request
+
+        Returns:
+            Whatever func returns
+        """
+        deadline = self.deadline
+        if deadline is None or time.monotonic() > deadline:
+            self.stop()
+            return func()
+
+        route = route_key(method, path)
+        if self.route is not None and route != self.route:
+            return func()
+
+        with self.lock:
+            self.requests_seen += 1
+
+        if random.random() >= self.sample_rate or not self.profile_lock.acquire(blocking=False):
+            return func()
+
+        # Imported on first use: the profiler costs nothing until a window is opened
+        import cProfile
+        
+        try:
+            profile = cProfile.Profile()
+            memory_before = tracemalloc.get_traced_memory()[0] if tracemalloc.is_tracing() else 0
+            start = time.perf_counter()
+
+            profile.enable()
+            try:
+                return func()
+            finally:
+                profile.disable()
+                elapsed = time.perf_counter() - start
+                allocated = tracemalloc.get_traced_memory()[0] - memory_before if tracemalloc.is_tracing() else 0
+                self.record(route, profile, elapsed, allocated)
+        finally:
+            self.profile_lock.release()
+
+    def record(self, route, profile, elapsed, allocated):
+        """Merge one profiled request into the window's statistics"""
+        import pstats
+        
+        with self.lock:
+            if self.stats is None:
+                self.stats = pstats.Stats(profile)
+            else:
+                self.stats.add(profile)
+
+            self.requests_profiled += 1
+
+            counters = self.routes.setdefault(route, {'profiled': 0, 'total_time': 0.0, 'net_allocated_bytes': 0})
+            counters['profiled'] += 1
+            counters['total_time'] += elapsed
+            counters['net_allocated_bytes'] += allocated
+
+    def hot_functions(self, limit, sort):
+        """Top functions by cumulative ('cumulative') or own ('tottime') time"""
+        if self.stats is None:
+            return []
+
+        index = 3 if sort == 'cumulative' else 2
+        entries = sorted(self.stats.stats.items(), key=lambda item: item[1][index], reverse=True)
+
+        return [
+            {
+                'function': f"{os.path.basename(filename)}:{line}({name})",
+                'calls': calls,
+                'total_time': round(own_time, 6),
+                'cumulative_time': round(cumulative_time, 6)
+            }
+            for (filename, line, name), (primitive_calls, calls, own_time, cumulative_time, callers) in entries[:limit]
+        ]
+
+    def top_allocations(self, limit):
+        """Allocation sites that grew the most since the window opened"""
+        if self.baseline is None:
+            return []
+
+        snapshot = self.final
+        if snapshot is None and tracemalloc.is_tracing():
+            snapshot = tracemalloc.take_snapshot()
+        if snapshot is None:
+            return []
+
+        # Leave out memory held by tracemalloc and the profiler itself
+        ignore = [
+            tracemalloc.Filter(False, tracemalloc.__file__),
+            tracemalloc.Filter(False, __file__),
+            tracemalloc.Filter(False, '*/pstats.py')
+        ]
+        differences = snapshot.filter_traces(ignore).compare_to(self.baseline.filter_traces(ignore), 'lineno')
+
+        return [
+            {
+                'location': f"{difference.traceback[0].filename}:{difference.traceback[0].lineno}",
+                'size_kb': round(difference.size / 1024, 1),
+                'size_diff_kb': round(difference.size_diff / 1024, 1),
+                'count_diff': difference.count_diff
+            }
+            for difference in differences[:limit]
+        ]
+
+    def report(self, limit=20, sort='cumulative'):
+        """
+        Aggregated report of the current or last window
+
+        Args:
+            limit: Number of functions and allocation sites to list
+            sort: 'cumulative' or 'tottime'
+
+        Returns:
+            Dictionary suitable for a JSON response
+        """
+        if self.active and time.monotonic() > self.deadline:
+            self.stop()
+
+        with self.lock:
+            return {
+                'active': self.active,
+                'started_at': self.started_at,
+                'remaining_seconds': round(max(0.0, self.deadline - time.monotonic()), 1) if self.active else 0,
+                'route': self.route,
+                'sample_rate': self.sample_rate,
+                'requests_seen': self.requests_seen,
+                'requests_profiled': self.requests_profiled,
+                'routes': {
+                    route: {
+                        'profiled': counters['profiled'],
+                        'average_time': counters['total_time'] / counters['profiled'],
+                        'average_net_allocated_bytes': counters['net_allocated_bytes'] // counters['profiled']
+                    }
+                    for route, counters in self.routes.items()
+                },
+                'hot_functions': self.hot_functions(limit, sort),
+                'top_allocations': self.top_allocations(limit)
+            }
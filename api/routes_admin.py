@@ -0,0 +1,107 @@
+import json
+
+def handle_get_profile(handler, profiler, query):
+    """
+    GET /admin/profile
+    Return the aggregated report of the current or last profiling window
+
+    Args:
+        handler: HTTP request handler
+        profiler: Profiler instance
+        query: Parsed query string (limit, sort)
+    """
+    try:
+        limit = int(query.get('limit', ['20'])[0])
+    except ValueError:
+        send_400(handler, "limit must be an integer")
+        return
+
+    sort = query.get('sort', ['cumulative'])[0]
+    if sort not in ('cumulative', 'tottime'):
+        send_400(handler, "sort must be cumulative or tottime")
+        return
+
+    send_report(handler, 200, profiler.report(limit, sort))
+
+def handle_start_profile(handler, profiler):
+    """
+    POST /admin/profile
+    Open a profiling window
+
+    Body (all optional):
+        seconds: Window length (default 60)
+        sample_rate: Fraction of requests to profile, 0-1 (default 1)
+        route: Only profile this route, e.g. "GET /transactions"
+        allocations: Trace allocations with tracemalloc (default true)
+
+    Args:
+        handler: HTTP request handler
+        profiler: Profiler instance
+    """
+    try:
+        content_length = int(handler.headers.get('Content-Length', 0))
+        body = handler.rfile.read(content_length).decode('utf-8')
+        options = json.loads(body) if body else {}
+        if not isinstance(options, dict):
+            send_400(handler, "Body must be a JSON object")
+            return
+
+        seconds = float(options.get('seconds', 60))
+        sample_rate = float(options.get('sample_rate', 1.0))
+        route = options.get('route')
+        allocations = bool(options.get('allocations', True))
+    except json.JSONDecodeError:
+        send_400(handler, "Invalid JSON format")
+        return
+    except (TypeError, ValueError):
+        send_400(handler, "seconds and sample_rate must be numbers")
+        return
+
+    if route is not None and not isinstance(route, str):
+        send_400(handler, "route must be a string like \"GET /transactions\"")
+        return
+
+    if seconds <= 0 or not 0 < sample_rate <= 1:
+        send_400(handler, "seconds must be positive and sample_rate between 0 and 1")
+        return
+
+    profiler.start(seconds, sample_rate, route, allocations)
+    send_report(handler, 201, profiler.report(limit=0))
+
+def handle_stop_profile(handler, profiler):
+    """
+    DELETE /admin/profile
+    Close the profiling window early and return the final report
+
+    Args:
+        handler: HTTP request handler
+        profiler: Profiler instance
+    """
+    profiler.stop()
+    send_report(handler, 200, profiler.report())
+
+def send_report(handler, status, report):
+    """Send a profiling report"""
+    handler.send_response(status)
+    handler.send_header('Content-Type', 'application/json')
+    handler.end_headers()
+
+    response = {
+        'success': True,
+        'data': report
+    }
+
+    handler.wfile.write(json.dumps(response, indent=2).encode())
+
+def send_400(handler, message):
+    """Send 400 Bad Request response"""
+    handler.send_response(400)
+    handler.send_header('Content-Type', 'application/json')
+    handler.end_headers()
+
+    response = {
+        'success': False,
+        'error': message
+    }
+
+    handler.wfile.write(json.dumps(response, indent=2).encode())
@@ -2,34 +2,112 @@
 import json
 import sys
 import os
+import time
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from dsa.search_dict import dict_search
+from dsa.xml_parser import EXPORT_ENCODERS
+from dsa.snapshot import RECORD_SEPARATOR
 
-def handle_get_all_transactions(handler, transactions):
+EXPORT_CONTENT_TYPES = {
+    'ndjson': 'application/x-ndjson',
+    'csv': 'text/csv; charset=utf-8'
+}
+
+# Flush exported lines to the socket roughly this many characters at a time
+EXPORT_CHUNK_SIZE = 64 * 1024
+
+# Most IDs one multi-get request may ask for
+MAX_BATCH_IDS = 1000
+
+def parse_fields(query):
+    """
+    Read the sparse fieldset from ?fields=id,amount,...
+    
+    Args:
+        query: Parsed query string (from urllib.parse.parse_qs)
+    
+    Returns:
+        List of field names, or None to return whole transactions
+    """
+    fields = [field.strip() for value in query.get('fields', []) for field in value.split(',') if field.strip()]
+    return fields or None
+
+def parse_ids(values):
+    """
+    Read transaction IDs from ?ids=1,5,9 (or a JSON list)
+    
+    Args:
+        values: List of comma-separated strings, or of IDs
+    
+    Returns:
+        List of integer IDs, duplicates removed, in the order first given
+    
+    Raises:
+        ValueError: If an ID is not an integer
+    """
+    ids = []
+    for value in values:
+        if isinstance(value, str):
+            ids.extend(int(part) for part in value.split(',') if part.strip())
+        elif isinstance(value, int) and not isinstance(value, bool):
+            ids.append(value)
+        else:
+            raise ValueError(f"Invalid transaction ID: {value!r}")
+    
+    return list(dict.fromkeys(ids))
+
+def project(transaction, fields):
+    """
+    Pick only the requested fields of a transaction
+    
+    Builds a small dict holding just those keys instead of copying the
+    whole transaction; fields the transaction does not have are skipped.
+    
+    Args:
+        transaction: Transaction dictionary
+        fields: List of field names, or None for the whole transaction
+    
+    Returns:
+        Transaction dictionary
+    """
+    if fields is None:
+        return transaction
+    return {field: transaction[field] for field in fields if field in transaction}
+
+def handle_get_all_transactions(handler, storage, snapshot=None, fields=None):
     """
     GET /transactions
     Return all transactions
     
     Args:
         handler: HTTP request handler
-        transactions: List of all transactions
+        storage: Storage backend
+        snapshot: Optional memory-mapped Snapshot to serve from instead
+        fields: Optional list of fields to include in each transaction
     """
     handler.send_response(200)
     handler.send_header('Content-Type', 'application/json')
     handler.end_headers()
     
+    if snapshot is not None and fields is None:
+        handler.wfile.write(f'{{\n  "success": true,\n  "count": {len(snapshot)},\n  "data": [\n  '.encode())
+        handler.wfile.write(snapshot.all_raw())
+        handler.wfile.write(b'\n  ]\n}')
+        return
+    
+    transactions = snapshot if snapshot is not None else storage.all()
+    
     response = {
         'success': True,
         'count': len(transactions),
-        'data': transactions
+        'data': transactions if fields is None else [project(t, fields) for t in transactions]
     }
     
     handler.wfile.write(json.dumps(response, indent=2).encode())
 
-def handle_get_transaction_by_id(handler, transaction_id, transaction_dict):
+def handle_get_transaction_by_id(handler, transaction_id, storage, snapshot=None, fields=None):
     """
     GET /transactions/{id}
     Return single transaction by ID
@@ -37,11 +115,30 @@ def handle_get_transaction_by_id(handler, transaction_id, transaction_dict):
     Args:
         handler: HTTP request handler
         transaction_id: ID to search for
-        transaction_dict: Dictionary of transactions
+        storage: Storage backend
+        snapshot: Optional memory-mapped Snapshot to serve from instead
+        fields: Optional list of fields to include
     """
     try:
         tid = int(transaction_id)
-        transaction = dict_search(transaction_dict, tid)
+        
+        if snapshot is not None and fields is None:
+            raw = snapshot.get_raw(tid)
+            if raw is None:
+                send_404(handler, f"Transaction with ID {tid} not found")
+                return
+            
+            handler.send_response(200)
+            handler.send_header('Content-Type', 'application/json')
+            handler.end_headers()
+            
+            # Write the pre-encoded record straight from the mapping
+            handler.wfile.write(b'{\n  "success": true,\n  "data": ')
+            handler.wfile.write(raw)
+            handler.wfile.write(b'\n}')
+            return
+        
+        transaction = snapshot.get(tid) if snapshot is not None else storage.get(tid)
         
         if transaction:
             handler.send_response(200)
@@ -50,7 +147,7 @@ def handle_get_transaction_by_id(handler, transaction_id, transaction_dict):
             
             response = {
                 'success': True,
-                'data': transaction
+                'data': project(transaction, fields)
             }
             
             handler.wfile.write(json.dumps(response, indent=2).encode())
@@ -60,6 +157,164 @@ def handle_get_transaction_by_id(handler, transaction_id, transaction_dict):
     except ValueError:
         send_400(handler, "Invalid transaction ID format")
 
+def handle_export_transactions(handler, records, export_format):
+    """
+    GET /transactions/export?format=ndjson|csv
+    Stream every transaction without building the whole response in memory
+    
+    HTTP/1.1 clients get a chunked response; HTTP/1.0 clients get the body
+    written until the connection closes.
+    
+    Args:
+        handler: HTTP request handler
+        records: Iterable of transactions (consumed lazily)
+        export_format: 'ndjson' or 'csv'
+    """
+    if export_format not in EXPORT_ENCODERS:
+        send_400(handler, f"Unsupported export format: {export_format} (use ndjson or csv)")
+        return
+    
+    chunked = handler.request_version == 'HTTP/1.1'
+    if chunked:
+        # Chunked encoding needs an HTTP/1.1 status line
+        handler.protocol_version = 'HTTP/1.1'
+    
+    handler.send_response(200)
+    handler.send_header('Content-Type', EXPORT_CONTENT_TYPES[export_format])
+    handler.send_header('Content-Disposition', f'attachment; filename="transactions.{export_format}"')
+    if chunked:
+        handler.send_header('Transfer-Encoding', 'chunked')
+    handler.send_header('Connection', 'close')
+    handler.end_headers()
+    handler.close_connection = True
+    
+    def write(data):
+        if chunked:
+            handler.wfile.write(f'{len(data):X}\r\n'.encode() + data + b'\r\n')
+        else:
+            handler.wfile.write(data)
+    
+    buffer = []
+    size = 0
+    for line in EXPORT_ENCODERS[export_format](records):
+        buffer.append(line)
+        size += len(line)
+        if size >= EXPORT_CHUNK_SIZE:
+            write(''.join(buffer).encode())
+            buffer = []
+            size = 0
+    
+    if buffer:
+        write(''.join(buffer).encode())
+    if chunked:
+        handler.wfile.write(b'0\r\n\r\n')
+
+def handle_get_transactions_by_ids(handler, transaction_ids, storage, snapshot=None, fields=None):
+    """
+    GET /transactions?ids=1,5,9
+    Return several transactions by ID in one response
+    
+    All IDs are looked up first, then the found transactions (in the order
+    requested) and the missing IDs are serialized together in one pass.
+    
+    Args:
+        handler: HTTP request handler
+        transaction_ids: List of IDs, or of comma-separated ID strings
+        storage: Storage backend
+        snapshot: Optional memory-mapped Snapshot to serve from instead
+        fields: Optional list of fields to include in each transaction
+    """
+    try:
+        ids = parse_ids(transaction_ids)
+    except ValueError:
+        send_400(handler, "Invalid transaction ID format")
+        return
+    
+    if not ids:
+        send_400(handler, "No transaction IDs given")
+        return
+    if len(ids) > MAX_BATCH_IDS:
+        send_400(handler, f"At most {MAX_BATCH_IDS} IDs per request")
+        return
+    
+    if snapshot is not None and fields is None:
+        raws = [snapshot.get_raw(tid) for tid in ids]
+        found = [raw for raw in raws if raw is not None]
+        missing = [tid for tid, raw in zip(ids, raws) if raw is None]
+        
+        handler.send_response(200)
+        handler.send_header('Content-Type', 'application/json')
+        handler.end_headers()
+        
+        # Join the pre-encoded records straight from the mapping
+        data = b'[\n  ' + RECORD_SEPARATOR.join(found) + b'\n  ]' if found else b'[]'
+        missing_json = json.dumps(missing, indent=2).replace('\n', '\n  ')
+        handler.wfile.write(
+            f'{{\n  "success": true,\n  "count": {len(found)},\n  "data": '.encode()
+            + data
+            + f',\n  "missing": {missing_json}\n}}'.encode()
+        )
+        return
+    
+    if snapshot is not None:
+        transactions = [snapshot.get(tid) for tid in ids]
+    else:
+        transactions = storage.get_many(ids)
+    
+    found = [project(transaction, fields) for transaction in transactions if transaction is not None]
+    missing = [tid for tid, transaction in zip(ids, transactions) if transaction is None]
+    
+    handler.send_response(200)
+    handler.send_header('Content-Type', 'application/json')
+    handler.end_headers()
+    
+    response = {
+        'success': True,
+        'count': len(found),
+        'data': found,
+        'missing': missing
+    }
+    
+    handler.wfile.write(json.dumps(response, indent=2).encode())
+
+def handle_lookup_transactions(handler, storage, snapshot=None, fields=None):
+    """
+    POST /transactions/lookup
+    Multi-get for ID lists too long for a URL
+    
+    Body:
+        ids: List of transaction IDs
+        fields: Optional list (or comma-separated string) of fields to include
+    
+    Args:
+        handler: HTTP request handler
+        storage: Storage backend
+        snapshot: Optional memory-mapped Snapshot to serve from instead
+        fields: Fields from the query string, used if the body gives none
+    """
+    try:
+        content_length = int(handler.headers.get('Content-Length', 0))
+        body = handler.rfile.read(content_length).decode('utf-8')
+        lookup = json.loads(body)
+    except json.JSONDecodeError:
+        send_400(handler, "Invalid JSON format")
+        return
+    
+    if not isinstance(lookup, dict) or not isinstance(lookup.get('ids'), list):
+        send_400(handler, "Body must be an object with an 'ids' list")
+        return
+    
+    if 'fields' in lookup:
+        body_fields = lookup['fields']
+        if isinstance(body_fields, str):
+            body_fields = [body_fields]
+        if not isinstance(body_fields, list) or not all(isinstance(field, str) for field in body_fields):
+            send_400(handler, "'fields' must be a list of field names")
+            return
+        fields = parse_fields({'fields': body_fields})
+    
+    handle_get_transactions_by_ids(handler, lookup['ids'], storage, snapshot, fields)
+
 def send_404(handler, message):
     """Send 404 Not Found response"""
     handler.send_response(404)
@@ -85,3 +340,53 @@ def send_400(handler, message):
     }
     
     handler.wfile.write(json.dumps(response, indent=2).encode())
+
+def benchmark_projection(transactions, fields, repeat=10):
+    """
+    Compare full and projected GET /transactions responses
+    
+    Args:
+        transactions: List of transaction dictionaries
+        fields: Sparse fieldset to project onto
+        repeat: Number of times each response is serialized
+    
+    Returns:
+        Dictionary with bytes and serialization time of each response
+    """
+    def measure(build):
+        start = time.perf_counter()
+        for _ in range(repeat):
+            body = json.dumps({'success': True, 'count': len(transactions), 'data': build()}, indent=2).encode()
+        return len(body), (time.perf_counter() - start) / repeat
+    
+    full_bytes, full_time = measure(lambda: transactions)
+    projected_bytes, projected_time = measure(lambda: [project(t, fields) for t in transactions])
+    
+    return {
+        'fields': fields,
+        'full_bytes': full_bytes,
+        'full_time': full_time,
+        'projected_bytes': projected_bytes,
+        'projected_time': projected_time,
+        'bytes_saved': 1 - projected_bytes / full_bytes if full_bytes else 0,
+        'speedup': full_time / projected_time if projected_time > 0 else float('inf')
+    }
+
+# Example usage
+if __name__ == '__main__':
+    from dsa.xml_parser import parse_xml_to_json
+    
+    xml_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modified_sms_v2.xml')
+    base = parse_xml_to_json(xml_file)
+    
+    # Repeat the sample data so timings are measurable
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 500
+    transactions = [dict(t, id=i + 1) for i, t in enumerate(base * scale)]
+    
+    results = benchmark_projection(transactions, ['id', 'type', 'amount', 'timestamp'])
+    
+    print(f"Projection benchmark ({len(transactions)} transactions, fields={','.join(results['fields'])})")
+    print(f"Full response: {results['full_bytes']} bytes, {results['full_time']:.6f} seconds")
+    print(f"Projected response: {results['projected_bytes']} bytes, {results['projected_time']:.6f} seconds")
+    print(f"Bytes saved: {results['bytes_saved']:.1%}")
+    print(f"Speedup: {results['speedup']:.2f}x faster")
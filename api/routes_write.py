@@ -1,21 +1,13 @@
 import json
-import sys
-import os
 
-# Add parent directory to path for imports
-sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
-
-from dsa.search_dict import dict_search
-
-def handle_post_transaction(handler, transactions, transaction_dict):
+def handle_post_transaction(handler, storage):
     """
     POST /transactions
     Add a new transaction
     
     Args:
         handler: HTTP request handler
-        transactions: List of all transactions
-        transaction_dict: Dictionary of transactions
+        storage: Storage backend
     """
     try:
         # Read request body
@@ -31,10 +23,6 @@ def handle_post_transaction(handler, transactions, transaction_dict):
             send_400(handler, f"Missing required fields: {', '.join(missing_fields)}")
             return
         
-        # Generate new ID
-        new_id = max([t['id'] for t in transactions]) + 1 if transactions else 1
-        new_transaction['id'] = new_id
-        
         # Add default fields if not provided
         if 'balance' not in new_transaction:
             new_transaction['balance'] = '0'
@@ -49,9 +37,8 @@ def handle_post_transaction(handler, transactions, transaction_dict):
         if 'txid' not in new_transaction:
             new_transaction['txid'] = ''
         
-        # Add to storage
-        transactions.append(new_transaction)
-        transaction_dict[new_id] = new_transaction
+        # Add to storage (assigns the new ID)
+        new_transaction = storage.create(new_transaction)
         
         # Send response
         handler.send_response(201)
@@ -71,7 +58,7 @@ def handle_post_transaction(handler, transactions, transaction_dict):
     except Exception as e:
         send_500(handler, str(e))
 
-def handle_put_transaction(handler, transaction_id, transactions, transaction_dict):
+def handle_put_transaction(handler, transaction_id, storage):
     """
     PUT /transactions/{id}
     Update an existing transaction
@@ -79,14 +66,13 @@ def handle_put_transaction(handler, transaction_id, transactions, transaction_di
     Args:
         handler: HTTP request handler
         transaction_id: ID of transaction to update
-        transactions: List of all transactions
-        transaction_dict: Dictionary of transactions
+        storage: Storage backend
     """
     try:
         tid = int(transaction_id)
         
         # Check if transaction exists
-        existing = dict_search(transaction_dict, tid)
+        existing = storage.get(tid)
         if not existing:
             send_404(handler, f"Transaction with ID {tid} not found")
             return
@@ -99,14 +85,8 @@ def handle_put_transaction(handler, transaction_id, transactions, transaction_di
         # Update transaction (keep the same ID)
         update_data['id'] = tid
         
-        # Find and update in list
-        for i, t in enumerate(transactions):
-            if t['id'] == tid:
-                transactions[i].update(update_data)
-                break
-        
-        # Update in dictionary
-        transaction_dict[tid].update(update_data)
+        # Update in storage
+        updated = storage.update(tid, update_data)
         
         # Send response
         handler.send_response(200)
@@ -116,7 +96,7 @@ def handle_put_transaction(handler, transaction_id, transactions, transaction_di
         response = {
             'success': True,
             'message': 'Transaction updated successfully',
-            'data': transaction_dict[tid]
+            'data': updated
         }
         
         handler.wfile.write(json.dumps(response, indent=2).encode())
@@ -128,7 +108,7 @@ def handle_put_transaction(handler, transaction_id, transactions, transaction_di
     except Exception as e:
         send_500(handler, str(e))
 
-def handle_delete_transaction(handler, transaction_id, transactions, transaction_dict):
+def handle_delete_transaction(handler, transaction_id, storage):
     """
     DELETE /transactions/{id}
     Delete a transaction
@@ -136,24 +116,16 @@ def handle_delete_transaction(handler, transaction_id, transactions, transaction
     Args:
         handler: HTTP request handler
         transaction_id: ID of transaction to delete
-        transactions: List of all transactions
-        transaction_dict: Dictionary of transactions
+        storage: Storage backend
     """
     try:
         tid = int(transaction_id)
         
-        # Check if transaction exists
-        existing = dict_search(transaction_dict, tid)
-        if not existing:
+        # Remove from storage
+        if not storage.delete(tid):
             send_404(handler, f"Transaction with ID {tid} not found")
             return
         
-        # Remove from list
-        transactions[:] = [t for t in transactions if t['id'] != tid]
-        
-        # Remove from dictionary
-        del transaction_dict[tid]
-        
         # Send response
         handler.send_response(200)
         handler.send_header('Content-Type', 'application/json')
@@ -1,80 +1,296 @@
-from http.server import HTTPServer, BaseHTTPRequestHandler
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+import functools
 import json
 import sys
 import os
+import threading
+from urllib.parse import urlsplit, parse_qs
 
 # Add parent directory to path for imports
 sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 
-from dsa.xml_parser import parse_xml_to_json
-from dsa.search_dict import create_transaction_dict
-from api.auth import authenticate, get_auth_response_headers
-from api.routes_get import handle_get_all_transactions, handle_get_transaction_by_id
+from dsa.xml_parser import parse_xml_to_json, expand_xml_files, ingest_xml_files
+from dsa.snapshot import Snapshot
+from api.storage import MemoryStorage, SQLiteStorage
+from api.auth import get_authenticated_user, get_auth_response_headers
+from api.admission import AdmissionController, RATE_LIMITS, MAX_IN_FLIGHT, parse_rate_limits, retry_after_header
+from api.routes_get import handle_get_all_transactions, handle_get_transaction_by_id, handle_get_transactions_by_ids, handle_lookup_transactions, handle_export_transactions, parse_fields
 from api.routes_write import handle_post_transaction, handle_put_transaction, handle_delete_transaction
+from api.routes_admin import handle_get_profile, handle_start_profile, handle_stop_profile
+from api.loading import LoadState
+from api.profiling import Profiler
 
-# Load transactions at startup
+# Default XML backup
 XML_FILE = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modified_sms_v2.xml')
-transactions = parse_xml_to_json(XML_FILE)
-transaction_dict = create_transaction_dict(transactions)
 
-print(f"Loaded {len(transactions)} transactions from XML")
+# Several (overlapping) backups can be merged: comma-separated paths or globs
+XML_FILES = [path.strip() for path in os.environ.get('TRANSACTIONS_XML', XML_FILE).split(',') if path.strip()]
+
+# Read-only replicas serve a memory-mapped snapshot instead of parsing the XML
+SNAPSHOT_FILE = os.environ.get('TRANSACTIONS_SNAPSHOT')
+
+# Persist transactions in SQLite instead of keeping them in memory
+DB_FILE = os.environ.get('TRANSACTIONS_DB')
+
+# Extract type/amount/sender/... from the SMS body on first access instead of at startup
+LAZY_INGEST = os.environ.get('TRANSACTIONS_LAZY_INGEST', '') not in ('', '0')
+
+def load_xml(lazy=False):
+    """
+    Parse XML_FILES
+    A single file is parsed as-is, like parse_xml_to_json(path); several
+    files are ingested in parallel and deduplicated
+    
+    Returns:
+        List of transactions
+    """
+    xml_files = expand_xml_files(XML_FILES)
+    if len(xml_files) == 1:
+        return parse_xml_to_json(xml_files[0], lazy)
+    
+    result = ingest_xml_files(xml_files, lazy)
+    print(f"Ingested {result['parsed']} messages from {result['files']} files, "
+          f"dropped {result['duplicates_dropped']} duplicates "
+          f"({result['duplicates_by_txid']} by txid, {result['duplicates_by_content']} by content)")
+    return result['transactions']
+
+# Filled in by load_dataset(), which runs after the server is already listening
+snapshot = None
+storage = None
+loader = LoadState()
+
+def load_dataset():
+    """
+    Load the transactions into `storage` (and `snapshot`), recording progress in `loader`
+    Failures are recorded rather than raised, so /healthz can report them
+    """
+    global snapshot, storage
+    
+    loader.begin()
+    
+    try:
+        if SNAPSHOT_FILE:
+            loader.update('mapping snapshot')
+            loaded_snapshot = Snapshot(SNAPSHOT_FILE)
+            loaded_storage = MemoryStorage()
+            print(f"Mapped {len(loaded_snapshot)} transactions from snapshot {SNAPSHOT_FILE}")
+            records = len(loaded_snapshot)
+        elif DB_FILE:
+            loaded_snapshot = None
+            loader.update('opening database')
+            loaded_storage = SQLiteStorage(DB_FILE)
+            if len(loaded_storage) == 0:
+                loader.update('parsing XML')
+                transactions = load_xml()
+                loader.update('writing database', len(transactions))
+                loaded_storage.load(transactions)
+                print(f"Loaded {len(loaded_storage)} transactions from XML into {DB_FILE}")
+            else:
+                print(f"Opened {len(loaded_storage)} transactions from {DB_FILE}")
+            records = len(loaded_storage)
+        else:
+            loaded_snapshot = None
+            loader.update('parsing XML')
+            transactions = load_xml(lazy=LAZY_INGEST)
+            loader.update('indexing', len(transactions))
+            loaded_storage = MemoryStorage(transactions)
+            print(f"Loaded {len(loaded_storage)} transactions from XML")
+            records = len(loaded_storage)
+    except Exception as e:
+        loader.fail(e)
+        print(f"Loading transactions failed: {e}")
+        return
+    
+    snapshot = loaded_snapshot
+    storage = loaded_storage
+    loader.finish(records)
+
+# Per-user rate limits ("admin=50:100,user=5:10") and the in-flight request cap
+admission = AdmissionController(
+    limits={**RATE_LIMITS, **parse_rate_limits(os.environ.get('RATE_LIMITS', ''))},
+    max_in_flight=int(os.environ.get('MAX_IN_FLIGHT', MAX_IN_FLIGHT))
+)
+
+# Opt-in profiling: PROFILE_SECONDS opens a window at startup, /admin/profile at runtime
+profiler = Profiler()
+
+def profiled(method):
+    """Run a do_* method under the profiler while a profiling window is open"""
+    @functools.wraps(method)
+    def wrapper(self):
+        # Leave the profiler's own endpoints out of the statistics
+        if not profiler.active or self.path.startswith('/admin/'):
+            return method(self)
+        return profiler.run(self.command, self.path, lambda: method(self))
+    return wrapper
 
 class TransactionAPIHandler(BaseHTTPRequestHandler):
     """HTTP Request Handler for Transaction API"""
     
+    # Set by check_auth() / admit() for the request being handled
+    username = None
+    admitted = False
+    
+    # Number of pre-forked worker processes (set by run_server)
+    workers = 1
+    
+    def handle_one_request(self):
+        """Handle one request, then release its admission slot"""
+        try:
+            super().handle_one_request()
+        finally:
+            if self.admitted:
+                self.admitted = False
+                admission.leave()
+    
+    @profiled
     def do_GET(self):
         """Handle GET requests"""
+        url = urlsplit(self.path)
+        query = parse_qs(url.query, keep_blank_values=True)
+        
+        # Probes are unauthenticated and never rate limited
+        if url.path == '/healthz':
+            self.handle_healthz()
+            return
+        if url.path == '/readyz':
+            self.handle_readyz()
+            return
+        
         # Check authentication
         if not self.check_auth():
             return
         
+        # Monitoring stays available while the server is shedding load
+        if url.path == '/metrics':
+            self.handle_metrics()
+            return
+        if url.path == '/admin/profile':
+            if self.require_admin() and self.check_profiling_available():
+                handle_get_profile(self, profiler, query)
+            return
+        
+        if not self.check_ready():
+            return
+        
+        # Rate limiting and overload shedding
+        if not self.admit():
+            return
+        
         # Route requests
-        if self.path == '/transactions':
-            handle_get_all_transactions(self, transactions)
-        elif self.path.startswith('/transactions/'):
-            transaction_id = self.path.split('/')[-1]
-            handle_get_transaction_by_id(self, transaction_id, transaction_dict)
+        if url.path == '/transactions' and 'ids' in query:
+            handle_get_transactions_by_ids(self, query['ids'], storage, snapshot, parse_fields(query))
+        elif url.path == '/transactions':
+            handle_get_all_transactions(self, storage, snapshot, parse_fields(query))
+        elif url.path == '/transactions/export':
+            export_format = query.get('format', ['ndjson'])[0]
+            records = snapshot if snapshot is not None else storage.iter_all()
+            handle_export_transactions(self, records, export_format)
+        elif url.path.startswith('/transactions/'):
+            transaction_id = url.path.split('/')[-1]
+            handle_get_transaction_by_id(self, transaction_id, storage, snapshot, parse_fields(query))
         else:
             self.send_404()
     
+    @profiled
     def do_POST(self):
         """Handle POST requests"""
         # Check authentication
         if not self.check_auth():
             return
         
+        if self.path == '/admin/profile':
+            if self.require_admin() and self.check_profiling_available():
+                handle_start_profile(self, profiler)
+            return
+        
+        if not self.check_ready():
+            return
+        
+        # Rate limiting and overload shedding
+        if not self.admit():
+            return
+        
+        url = urlsplit(self.path)
+        
+        # A read sent as POST, so it works on read-only replicas too
+        if url.path == '/transactions/lookup':
+            handle_lookup_transactions(self, storage, snapshot, parse_fields(parse_qs(url.query)))
+            return
+        
+        if snapshot is not None:
+            self.send_405()
+            return
+        
         # Route requests
         if self.path == '/transactions':
-            handle_post_transaction(self, transactions, transaction_dict)
+            handle_post_transaction(self, storage)
         else:
             self.send_404()
     
+    @profiled
     def do_PUT(self):
         """Handle PUT requests"""
         # Check authentication
         if not self.check_auth():
             return
         
+        if not self.check_ready():
+            return
+        
+        # Rate limiting and overload shedding
+        if not self.admit():
+            return
+        
+        if snapshot is not None:
+            self.send_405()
+            return
+        
         # Route requests
         if self.path.startswith('/transactions/'):
             transaction_id = self.path.split('/')[-1]
-            handle_put_transaction(self, transaction_id, transactions, transaction_dict)
+            handle_put_transaction(self, transaction_id, storage)
         else:
             self.send_404()
     
+    @profiled
     def do_DELETE(self):
         """Handle DELETE requests"""
         # Check authentication
         if not self.check_auth():
             return
         
+        if self.path == '/admin/profile':
+            if self.require_admin() and self.check_profiling_available():
+                handle_stop_profile(self, profiler)
+            return
+        
+        if not self.check_ready():
+            return
+        
+        # Rate limiting and overload shedding
+        if not self.admit():
+            return
+        
+        if snapshot is not None:
+            self.send_405()
+            return
+        
         # Route requests
         if self.path.startswith('/transactions/'):
             transaction_id = self.path.split('/')[-1]
-            handle_delete_transaction(self, transaction_id, transactions, transaction_dict)
+            handle_delete_transaction(self, transaction_id, storage)
         else:
             self.send_404()
     
+    def is_local_request(self):
+        """
+        True for POST/DELETE requests that do not change the dataset
+        Pre-fork workers handle these themselves instead of forwarding them to the owner
+        """
+        path = urlsplit(self.path).path
+        return path.startswith('/admin/') or path == '/transactions/lookup'
+    
     def check_auth(self):
         """
         Check authentication for request
@@ -82,12 +298,143 @@ class TransactionAPIHandler(BaseHTTPRequestHandler):
         """
         auth_header = self.headers.get('Authorization')
         
-        if not authenticate(auth_header):
+        self.username = get_authenticated_user(auth_header)
+        if self.username is None:
             self.send_401()
             return False
         
         return True
     
+    def admit(self):
+        """
+        Admission control, run before the body is read or anything is serialized
+        Sheds the request with 503 when too many are in flight, and with 429
+        when the user's token bucket is empty
+        Returns True if the request may proceed, False otherwise
+        """
+        if not admission.enter():
+            self.send_error_response(503, 'Server overloaded - try again later', retry_after=1)
+            return False
+        
+        self.admitted = True
+        
+        retry_after = admission.consume(self.username)
+        if retry_after:
+            self.send_error_response(429, 'Rate limit exceeded', retry_after=retry_after)
+            return False
+        
+        return True
+    
+    def check_ready(self):
+        """
+        Turn data requests away with 503 until the dataset has loaded
+        Returns True if the dataset is ready, False otherwise
+        """
+        # Writes queued on the parent's socket while the workers start up
+        # cannot be replicated to them
+        if getattr(self.server, 'handing_off', False) and self.command != 'GET':
+            self.send_error_response(503, 'Workers are starting - try again later', retry_after=1)
+            return False
+        
+        if loader.ready:
+            return True
+        
+        if loader.failed:
+            self.send_error_response(503, 'Loading transactions failed')
+        else:
+            self.send_error_response(503, 'Transactions are still loading - try again later', retry_after=1)
+        return False
+    
+    def require_admin(self):
+        """
+        Restrict an endpoint to the admin user
+        Returns True if allowed, False (after sending 403) otherwise
+        """
+        if self.username != 'admin':
+            self.send_error_response(403, 'Forbidden - admin only')
+            return False
+        
+        return True
+    
+    def check_profiling_available(self):
+        """
+        Profiling only works in a single process: each pre-forked worker would
+        profile its own share of the traffic, and requests land on random workers
+        Returns True if available, False (after sending 501) otherwise
+        """
+        if self.workers > 1:
+            self.send_error_response(501, 'Profiling is not available with --workers; run a single process')
+            return False
+        
+        return True
+    
+    def handle_metrics(self):
+        """GET /metrics - admission counters (admin only)"""
+        if not self.require_admin():
+            return
+        
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        
+        response = {
+            'success': True,
+            'data': {
+                'pid': os.getpid(),
+                'admission': admission.stats()
+            }
+        }
+        
+        self.wfile.write(json.dumps(response, indent=2).encode())
+    
+    def handle_healthz(self):
+        """GET /healthz - liveness: 200 unless loading the dataset failed"""
+        stats = loader.stats()
+        
+        self.send_response(503 if loader.failed else 200)
+        self.send_header('Content-Type', 'application/json')
+        self.end_headers()
+        
+        response = {
+            'success': not loader.failed,
+            'data': {
+                'status': 'failed' if loader.failed else 'alive',
+                'error': stats['error']
+            }
+        }
+        
+        self.wfile.write(json.dumps(response, indent=2).encode())
+    
+    def handle_readyz(self):
+        """GET /readyz - readiness: 200 once the dataset is loaded, 503 with progress before"""
+        self.send_response(200 if loader.ready else 503)
+        self.send_header('Content-Type', 'application/json')
+        if not loader.ready and not loader.failed:
+            self.send_header('Retry-After', '1')
+        self.end_headers()
+        
+        response = {
+            'success': loader.ready,
+            'data': loader.stats()
+        }
+        
+        self.wfile.write(json.dumps(response, indent=2).encode())
+    
+    def send_error_response(self, status, message, retry_after=None):
+        """Send a JSON error response, with Retry-After if given"""
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        if retry_after is not None:
+            self.send_header('Retry-After', retry_after_header(retry_after))
+        self.end_headers()
+        
+        response = {
+            'success': False,
+            'error': message
+        }
+        
+        self.wfile.write(json.dumps(response, indent=2).encode())
+    
     def send_401(self):
         """Send 401 Unauthorized response"""
         self.send_response(401)
@@ -116,21 +463,33 @@ class TransactionAPIHandler(BaseHTTPRequestHandler):
         
         self.wfile.write(json.dumps(response, indent=2).encode())
     
+    def send_405(self):
+        """Send 405 Method Not Allowed response (read-only snapshot mode)"""
+        self.send_response(405)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Allow', 'GET')
+        self.end_headers()
+        
+        response = {
+            'success': False,
+            'error': 'Server is a read-only replica'
+        }
+        
+        self.wfile.write(json.dumps(response, indent=2).encode())
+    
     def log_message(self, format, *args):
         """Custom log message format"""
         print(f"[{self.log_date_time_string()}] {format % args}")
 
-def run_server(host='localhost', port=8000):
+def run_server(host='localhost', port=8000, workers=1):
     """
     Start the HTTP server
     
     Args:
         host: Server host
         port: Server port
+        workers: Number of pre-forked worker processes (1 = single process)
     """
-    server_address = (host, port)
-    httpd = HTTPServer(server_address, TransactionAPIHandler)
-    
     print(f"\n{'='*50}")
     print(f"Transaction API Server")
     print(f"{'='*50}")
@@ -138,9 +497,15 @@ def run_server(host='localhost', port=8000):
     print(f"Available endpoints:")
     print(f"  GET    /transactions")
     print(f"  GET    /transactions/{{id}}")
+    print(f"  GET    /transactions?ids=1,5,9")
+    print(f"  POST   /transactions/lookup")
+    print(f"  GET    /transactions/export?format=ndjson|csv")
     print(f"  POST   /transactions")
     print(f"  PUT    /transactions/{{id}}")
     print(f"  DELETE /transactions/{{id}}")
+    print(f"  GET    /metrics (admin only)")
+    print(f"  GET    /healthz, /readyz (no auth)")
+    print(f"  GET|POST|DELETE /admin/profile (admin only)")
     print(f"\nAuthentication required:")
     print(f"  Username: admin, Password: password123")
     print(f"  Username: user, Password: user123")
@@ -148,6 +513,62 @@ def run_server(host='localhost', port=8000):
     print(f"{'='*50}\n")
     print("Press Ctrl+C to stop the server\n")
     
+    TransactionAPIHandler.workers = workers
+    
+    # Each worker admits requests on its own, so it gets a share of the limits
+    if workers > 1:
+        admission.split(workers)
+    
+    if os.environ.get('PROFILE_SECONDS') and workers > 1:
+        print("PROFILE_SECONDS ignored: profiling is not available with --workers")
+    elif os.environ.get('PROFILE_SECONDS'):
+        profiler.start(
+            float(os.environ['PROFILE_SECONDS']),
+            sample_rate=float(os.environ.get('PROFILE_SAMPLE_RATE', 1.0)),
+            route=os.environ.get('PROFILE_ROUTE') or None
+        )
+        print(f"Profiling for {os.environ['PROFILE_SECONDS']}s")
+    
+    if workers > 1:
+        from api.prefork import ReusePortHTTPServer, run_prefork_server
+        
+        # Listen first, so health checks are answered while the dataset loads.
+        # Workers inherit the loaded dataset, so they are forked once it is in
+        # memory; until then this process answers requests itself.
+        httpd = ReusePortHTTPServer((host, port), TransactionAPIHandler)
+        thread = threading.Thread(target=httpd.serve_forever, daemon=True)
+        thread.start()
+        
+        try:
+            load_dataset()
+            if loader.failed:
+                # Keep reporting the failure on /healthz until stopped
+                thread.join()
+        except KeyboardInterrupt:
+            print("\n\nShutting down server...")
+            httpd.shutdown()
+            httpd.server_close()
+            httpd.join_requests()
+            print("Server stopped.")
+            return
+        
+        # Stop accepting (new connections queue on the still-open socket) and
+        # wait for in-flight requests, so no other thread is running when we fork
+        httpd.shutdown()
+        thread.join()
+        httpd.join_requests()
+        
+        # A shared database already makes writes visible to every worker
+        run_prefork_server(TransactionAPIHandler, host, port, workers, replicate=not storage.shared, startup_server=httpd)
+        print("Server stopped.")
+        return
+    
+    # Listen first, so health checks are answered while the dataset loads
+    server_address = (host, port)
+    httpd = ThreadingHTTPServer(server_address, TransactionAPIHandler)
+    
+    threading.Thread(target=load_dataset, daemon=True).start()
+    
     try:
         httpd.serve_forever()
     except KeyboardInterrupt:
@@ -156,4 +577,13 @@ def run_server(host='localhost', port=8000):
         print("Server stopped.")
 
 if __name__ == '__main__':
-    run_server()
+    import argparse
+    
+    parser = argparse.ArgumentParser(description='Transaction API Server')
+    parser.add_argument('--host', default='localhost', help='Server host')
+    parser.add_argument('--port', type=int, default=8000, help='Server port')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes sharing the port via SO_REUSEPORT')
+    args = parser.parse_args()
+    
+    run_server(args.host, args.port, args.workers)
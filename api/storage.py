@@ -0,0 +1,589 @@
+import bisect
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+import sys
+from contextlib import contextmanager
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from dsa.search_dict import dict_search
+from dsa.xml_parser import FIELD_EXTRACTORS, extract_fields
+
+# Fields that get their own indexed column in SQLite and can be queried with find()
+INDEXED_FIELDS = ('txid', 'type', 'timestamp')
+
+# Most SQLite connections one process keeps open
+SQLITE_POOL_SIZE = 8
+
+# Transactions per leaf chunk of a StoreVersion
+CHUNK_SIZE = 256
+
+# Number of dictionaries the ID index of a StoreVersion is split into
+ID_BUCKETS = 1024
+
+class StoreVersion:
+    """
+    One immutable version of the in-memory dataset
+
+    Transactions are kept in ID order in a tuple of chunks (tuples of at
+    most CHUNK_SIZE transactions). The ID index is a tuple of ID_BUCKETS
+    dictionaries, each holding the IDs that hash to it. A write copies
+    only the spines, the one chunk and the one bucket it touches; every
+    other chunk, bucket and transaction is shared with the previous
+    version. Nothing reachable from a version is modified after it is
+    published.
+    """
+
+    __slots__ = ('number', 'chunks', 'first_ids', 'buckets', 'count', 'next_id', 'flat')
+
+    def __init__(self, number, chunks, first_ids, buckets, count, next_id):
+        self.number = number
+        self.chunks = chunks
+        self.first_ids = first_ids
+        self.buckets = buckets
+        self.count = count
+        self.next_id = next_id
+        self.flat = None
+
+    @classmethod
+    def build(cls, transactions):
+        """First version, holding the given transactions"""
+        transactions = sorted(transactions, key=lambda t: t['id'])
+        chunks = tuple(tuple(transactions[i:i + CHUNK_SIZE]) for i in range(0, len(transactions), CHUNK_SIZE))
+
+        buckets = [{} for _ in range(ID_BUCKETS)]
+        for transaction in transactions:
+            buckets[hash(transaction['id']) % ID_BUCKETS][transaction['id']] = transaction
+
+        return cls(
+            1,
+            chunks,
+            tuple(chunk[0]['id'] for chunk in chunks),
+            tuple(buckets),
+            len(transactions),
+            transactions[-1]['id'] + 1 if transactions else 1
+        )
+
+    def bucket(self, transaction_id):
+        """The index dictionary that holds transaction_id"""
+        return self.buckets[hash(transaction_id) % ID_BUCKETS]
+
+    def get(self, transaction_id):
+        """Return one transaction, or None"""
+        return dict_search(self.bucket(transaction_id), transaction_id)
+
+    def transactions(self):
+        """All transactions in ID order, as one tuple (built once per version)"""
+        flat = self.flat
+        if flat is None:
+            flat = self.flat = tuple(t for chunk in self.chunks for t in chunk)
+        return flat
+
+    def locate(self, transaction):
+        """Return (chunk index, position in chunk) of a stored transaction"""
+        chunk_index = bisect.bisect_right(self.first_ids, transaction['id']) - 1
+        chunk = self.chunks[chunk_index]
+        return chunk_index, next(i for i, t in enumerate(chunk) if t is transaction)
+
+    def with_bucket(self, transaction_id, bucket):
+        """Bucket spine with the bucket of transaction_id replaced"""
+        buckets = list(self.buckets)
+        buckets[hash(transaction_id) % ID_BUCKETS] = bucket
+        return tuple(buckets)
+
+    def with_chunk(self, chunk_index, chunk):
+        """Chunk and first-ID spines with one chunk replaced (or removed if empty)"""
+        chunks = list(self.chunks)
+        first_ids = list(self.first_ids)
+
+        if not chunk:
+            del chunks[chunk_index]
+            del first_ids[chunk_index]
+        elif chunk_index == len(chunks):
+            chunks.append(chunk)
+            first_ids.append(chunk[0]['id'])
+        else:
+            chunks[chunk_index] = chunk
+            first_ids[chunk_index] = chunk[0]['id']
+
+        return tuple(chunks), tuple(first_ids)
+
+class MemoryStorage:
+    """
+    In-memory storage backend with copy-on-write versions
+
+    Readers take the current StoreVersion without locking and keep using
+    it for as long as they need, e.g. while serializing GET /transactions.
+    Writers take a write lock, build the next version - sharing every
+    chunk, index bucket and transaction they do not change with the
+    previous one - and publish it by swapping a single reference, so
+    readers never see a half-applied write and never hold up a writer.
+    A write costs O(n / CHUNK_SIZE + CHUNK_SIZE + n / ID_BUCKETS), not O(n).
+    """
+
+    # Each process has its own copy of the data
+    shared = False
+
+    def __init__(self, transactions=None):
+        self.current = StoreVersion.build(transactions or [])
+        self.write_lock = threading.Lock()
+
+    def snapshot(self):
+        """Return the current immutable version"""
+        return self.current
+
+    def publish(self, chunks, first_ids, buckets, count, next_id):
+        """Make a new version current (caller holds write_lock)"""
+        self.current = StoreVersion(self.current.number + 1, chunks, first_ids, buckets, count, next_id)
+
+    def __len__(self):
+        return self.current.count
+
+    def all(self):
+        """Return all transactions in ID order (an immutable tuple)"""
+        return self.current.transactions()
+
+    def iter_all(self):
+        """Iterate over all transactions in ID order"""
+        return (t for chunk in self.current.chunks for t in chunk)
+
+    def get(self, transaction_id):
+        """Return one transaction, or None"""
+        return self.current.get(transaction_id)
+
+    def get_many(self, transaction_ids):
+        """Return the transaction for each ID (None where missing), all from one version"""
+        version = self.current
+        return [version.get(transaction_id) for transaction_id in transaction_ids]
+
+    def find(self, field, value):
+        """Return all transactions whose field equals value"""
+        transactions = self.current.transactions()
+        if field in FIELD_EXTRACTORS:
+            extract_fields(transactions, [field])
+        return [t for t in transactions if t.get(field) == value]
+
+    def create(self, transaction):
+        """
+        Store a new transaction under the next free ID
+
+        Returns:
+            The stored transaction
+        """
+        with self.write_lock:
+            version = self.current
+            transaction_id = transaction['id'] = version.next_id
+
+            # Append to the last chunk, or start a new one when it is full
+            chunk_index = len(version.chunks) - 1
+            if chunk_index < 0 or len(version.chunks[chunk_index]) >= CHUNK_SIZE:
+                chunk_index += 1
+                chunk = (transaction,)
+            else:
+                chunk = version.chunks[chunk_index] + (transaction,)
+
+            bucket = dict(version.bucket(transaction_id))
+            bucket[transaction_id] = transaction
+
+            self.publish(
+                *version.with_chunk(chunk_index, chunk),
+                version.with_bucket(transaction_id, bucket),
+                version.count + 1,
+                transaction_id + 1
+            )
+
+        return transaction
+
+    def update(self, transaction_id, update_data):
+        """
+        Merge update_data into an existing transaction
+
+        The stored transaction is replaced by an updated copy, never
+        modified in place, because older versions still reference it.
+
+        Returns:
+            The updated transaction, or None if it does not exist
+        """
+        with self.write_lock:
+            version = self.current
+            existing = version.get(transaction_id)
+            if existing is None:
+                return None
+
+            transaction = {**existing, **update_data}
+
+            chunk_index, position = version.locate(existing)
+            chunk = version.chunks[chunk_index]
+            chunk = chunk[:position] + (transaction,) + chunk[position + 1:]
+
+            bucket = dict(version.bucket(transaction_id))
+            bucket[transaction_id] = transaction
+
+            self.publish(
+                *version.with_chunk(chunk_index, chunk),
+                version.with_bucket(transaction_id, bucket),
+                version.count,
+                version.next_id
+            )
+
+        return transaction
+
+    def delete(self, transaction_id):
+        """
+        Delete a transaction
+
+        Returns:
+            True if it existed, False otherwise
+        """
+        with self.write_lock:
+            version = self.current
+            existing = version.get(transaction_id)
+            if existing is None:
+                return False
+
+            chunk_index, position = version.locate(existing)
+            chunk = version.chunks[chunk_index]
+            chunk = chunk[:position] + chunk[position + 1:]
+
+            bucket = dict(version.bucket(transaction_id))
+            del bucket[transaction_id]
+
+            self.publish(
+                *version.with_chunk(chunk_index, chunk),
+                version.with_bucket(transaction_id, bucket),
+                version.count - 1,
+                version.next_id
+            )
+
+        return True
+
+class SQLiteStorage:
+    """
+    SQLite storage backend
+
+    Each transaction is stored as a JSON document next to indexed columns
+    for the fields it is queried by, so arbitrary fields sent with POST/PUT
+    survive a round trip. The database runs in WAL mode so readers never
+    block the writer. Each operation borrows a connection from a bounded
+    pool and returns it afterwards, so the number of open connections does
+    not grow with the number of request threads; a forked process starts
+    its own pool. Statements are always the same parameterized SQL strings,
+    so sqlite3's per-connection statement cache keeps them prepared.
+    """
+
+    # All processes see the same database file
+    shared = True
+
+    CREATE_TABLE = """
+        CREATE TABLE IF NOT EXISTS transactions (
+            id INTEGER PRIMARY KEY,
+            txid TEXT,
+            type TEXT,
+            timestamp TEXT,
+            data TEXT NOT NULL
+        )
+    """
+    CREATE_INDEXES = [
+        "CREATE INDEX IF NOT EXISTS idx_transactions_txid ON transactions (txid)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_type ON transactions (type)",
+        "CREATE INDEX IF NOT EXISTS idx_transactions_timestamp ON transactions (timestamp)",
+    ]
+
+    SELECT_ALL = "SELECT data FROM transactions ORDER BY id"
+    SELECT_ONE = "SELECT data FROM transactions WHERE id = ?"
+    # IDs are passed as one JSON array, so the statement text never changes
+    SELECT_MANY = "SELECT id, data FROM transactions WHERE id IN (SELECT value FROM json_each(?))"
+    SELECT_COUNT = "SELECT COUNT(*) FROM transactions"
+    SELECT_NEXT_ID = "SELECT COALESCE(MAX(id), 0) + 1 FROM transactions"
+    INSERT = "INSERT INTO transactions (id, txid, type, timestamp, data) VALUES (?, ?, ?, ?, ?)"
+    UPDATE = "UPDATE transactions SET txid = ?, type = ?, timestamp = ?, data = ? WHERE id = ?"
+    DELETE = "DELETE FROM transactions WHERE id = ?"
+
+    def __init__(self, db_file, pool_size=SQLITE_POOL_SIZE):
+        self.db_file = db_file
+        self.pool_size = pool_size
+        self.pool_lock = threading.Lock()
+        # Connections inherited through fork() are kept referenced but never
+        # used or closed: closing them could release the parent's locks
+        self.inherited = []
+        self.reset_pool()
+
+        with self.connection() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(self.CREATE_TABLE)
+            for statement in self.CREATE_INDEXES:
+                conn.execute(statement)
+
+    def reset_pool(self):
+        """Start an empty pool owned by the calling process"""
+        self.pid = os.getpid()
+        self.idle = queue.Queue()
+        self.opened = []
+
+    def open_connection(self):
+        """Open a new connection (used by one thread at a time, via the pool)"""
+        conn = sqlite3.connect(self.db_file, isolation_level=None, check_same_thread=False)
+        conn.execute("PRAGMA synchronous=NORMAL")
+        return conn
+
+    @contextmanager
+    def connection(self):
+        """
+        Borrow a pooled connection for one operation
+
+        Opens a new connection while fewer than pool_size are open,
+        otherwise waits for one to be returned.
+        """
+        conn = None
+
+        with self.pool_lock:
+            if self.pid != os.getpid():
+                self.inherited.extend(self.opened)
+                self.reset_pool()
+
+            pool = self.idle
+            try:
+                conn = pool.get_nowait()
+            except queue.Empty:
+                if len(self.opened) < self.pool_size:
+                    conn = self.open_connection()
+                    self.opened.append(conn)
+
+        if conn is None:
+            conn = pool.get()
+
+        try:
+            yield conn
+        finally:
+            pool.put(conn)
+
+    def close(self):
+        """Close every connection opened by this process"""
+        with self.pool_lock:
+            if self.pid == os.getpid():
+                for conn in self.opened:
+                    conn.close()
+            self.reset_pool()
+
+    @staticmethod
+    def row_values(transaction):
+        """Indexed column values followed by the JSON document"""
+        return (
+            transaction.get('txid'),
+            transaction.get('type'),
+            transaction.get('timestamp'),
+            json.dumps(transaction, ensure_ascii=False)
+        )
+
+    def load(self, transactions, batch_size=1000):
+        """
+        Bulk-load transactions, committing once per batch
+
+        Args:
+            transactions: List of transaction dictionaries (with IDs)
+            batch_size: Rows per database transaction
+        """
+        with self.connection() as conn:
+            for start in range(0, len(transactions), batch_size):
+                batch = transactions[start:start + batch_size]
+                conn.execute("BEGIN")
+                try:
+                    conn.executemany(self.INSERT, [(t['id'],) + self.row_values(t) for t in batch])
+                    conn.execute("COMMIT")
+                except Exception:
+                    conn.execute("ROLLBACK")
+                    raise
+
+    def __len__(self):
+        with self.connection() as conn:
+            return conn.execute(self.SELECT_COUNT).fetchone()[0]
+
+    def all(self):
+        """Return all transactions in ID order"""
+        with self.connection() as conn:
+            return [json.loads(row[0]) for row in conn.execute(self.SELECT_ALL)]
+
+    def iter_all(self):
+        """
+        Iterate over all transactions in ID order, decoding one row at a time
+        The connection stays borrowed until the iteration finishes or is closed
+        """
+        with self.connection() as conn:
+            for row in conn.execute(self.SELECT_ALL):
+                yield json.loads(row[0])
+
+    def get(self, transaction_id):
+        """Return one transaction, or None"""
+        with self.connection() as conn:
+            row = conn.execute(self.SELECT_ONE, (transaction_id,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def get_many(self, transaction_ids):
+        """Return the transaction for each ID (None where missing), with one query"""
+        with self.connection() as conn:
+            rows = conn.execute(self.SELECT_MANY, (json.dumps(list(transaction_ids)),)).fetchall()
+        transaction_dict = {row[0]: json.loads(row[1]) for row in rows}
+        return [dict_search(transaction_dict, transaction_id) for transaction_id in transaction_ids]
+
+    def find(self, field, value):
+        """Return all transactions whose field equals value (indexed fields only)"""
+        if field not in INDEXED_FIELDS:
+            raise ValueError(f"Cannot query by {field}; indexed fields are {', '.join(INDEXED_FIELDS)}")
+
+        query = f"SELECT data FROM transactions WHERE {field} = ? ORDER BY id"
+        with self.connection() as conn:
+            return [json.loads(row[0]) for row in conn.execute(query, (value,))]
+
+    def create(self, transaction):
+        """
+        Store a new transaction under the next free ID
+
+        Returns:
+            The stored transaction
+        """
+        with self.connection() as conn:
+            # IMMEDIATE takes the write lock up front so two writers cannot pick the same ID
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                transaction['id'] = conn.execute(self.SELECT_NEXT_ID).fetchone()[0]
+                conn.execute(self.INSERT, (transaction['id'],) + self.row_values(transaction))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return transaction
+
+    def update(self, transaction_id, update_data):
+        """
+        Merge update_data into an existing transaction
+
+        Returns:
+            The updated transaction, or None if it does not exist
+        """
+        with self.connection() as conn:
+            conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = conn.execute(self.SELECT_ONE, (transaction_id,)).fetchone()
+                if row is None:
+                    conn.execute("ROLLBACK")
+                    return None
+
+                transaction = json.loads(row[0])
+                transaction.update(update_data)
+                conn.execute(self.UPDATE, self.row_values(transaction) + (transaction_id,))
+                conn.execute("COMMIT")
+            except Exception:
+                conn.execute("ROLLBACK")
+                raise
+
+        return transaction
+
+    def delete(self, transaction_id):
+        """
+        Delete a transaction
+
+        Returns:
+            True if it existed, False otherwise
+        """
+        with self.connection() as conn:
+            return conn.execute(self.DELETE, (transaction_id,)).rowcount > 0
+
+def benchmark_storage(storage, test_ids, scan_value='payment', writes=100):
+    """
+    Benchmark one storage backend
+
+    Args:
+        storage: MemoryStorage or SQLiteStorage (already loaded)
+        test_ids: List of IDs to look up
+        scan_value: Transaction type to query with find()
+        writes: Number of create/update/delete rounds
+
+    Returns:
+        Dictionary with benchmark results
+    """
+    start = time.perf_counter()
+    for test_id in test_ids:
+        storage.get(test_id)
+    lookup_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    total = len(storage.all())
+    scan_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    matches = len(storage.find('type', scan_value))
+    find_time = time.perf_counter() - start
+
+    start = time.perf_counter()
+    for _ in range(writes):
+        created = storage.create({'type': 'payment', 'amount': '100', 'sender': 'A', 'receiver': 'B'})
+        storage.update(created['id'], {'amount': '200'})
+        storage.delete(created['id'])
+    write_time = time.perf_counter() - start
+
+    return {
+        'method': type(storage).__name__,
+        'records': total,
+        'average_lookup_time': lookup_time / len(test_ids) if test_ids else 0,
+        'scan_time': scan_time,
+        'find_time': find_time,
+        'find_matches': matches,
+        'average_write_round_time': write_time / writes if writes else 0
+    }
+
+def compare_storage_backends(transactions, test_ids, db_file='benchmark.db', writes=100):
+    """
+    Compare the in-memory and SQLite backends on the same data
+
+    Returns:
+        Comparison results
+    """
+    if os.path.exists(db_file):
+        os.remove(db_file)
+
+    memory = MemoryStorage([dict(t) for t in transactions])
+    sqlite = SQLiteStorage(db_file)
+    sqlite.load(transactions)
+
+    results = {
+        'memory': benchmark_storage(memory, test_ids, writes=writes),
+        'sqlite': benchmark_storage(sqlite, test_ids, writes=writes)
+    }
+
+    sqlite.close()
+    for suffix in ('', '-wal', '-shm'):
+        if os.path.exists(db_file + suffix):
+            os.remove(db_file + suffix)
+
+    return results
+
+# Example usage
+if __name__ == '__main__':
+    from dsa.xml_parser import parse_xml_to_json
+
+    xml_file = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'modified_sms_v2.xml')
+    base = parse_xml_to_json(xml_file)
+
+    # Repeat the sample data so the difference between backends is visible
+    scale = int(sys.argv[1]) if len(sys.argv) > 1 else 5000
+    transactions = []
+    for copy in range(scale):
+        for t in base:
+            transactions.append(dict(t, id=len(transactions) + 1))
+
+    test_ids = list(range(1, len(transactions) + 1, max(1, len(transactions) // 1000)))
+    results = compare_storage_backends(transactions, test_ids)
+
+    print(f"Storage benchmark ({len(transactions)} transactions)")
+    for name, r in results.items():
+        print(f"\n{r['method']}:")
+        print(f"  Lookup - Average: {r['average_lookup_time']:.8f} seconds")
+        print(f"  Full scan: {r['scan_time']:.6f} seconds")
+        print(f"  Find by type ({r['find_matches']} matches): {r['find_time']:.6f} seconds")
+        print(f"  Create/update/delete round - Average: {r['average_write_round_time']:.8f} seconds")
@@ -0,0 +1,151 @@
+import json
+import mmap
+import struct
+
+# File layout:
+#   header  - magic, record count, offset of the data region
+#   index   - one fixed-width (id, offset, length) entry per record, sorted by id
+#   data    - pre-encoded JSON records, contiguous, separated by RECORD_SEPARATOR
+MAGIC = b'TXSNAP01'
+HEADER = struct.Struct('<8sQQ')
+INDEX_ENTRY = struct.Struct('<QQQ')
+RECORD_SEPARATOR = b',\n  '
+
+def encode_record(transaction):
+    """
+    Encode a transaction exactly as it appears under "data" in an API response
+
+    Args:
+        transaction: Transaction dictionary
+
+    Returns:
+        JSON bytes
+    """
+    return json.dumps(transaction, indent=2).replace('\n', '\n  ').encode()
+
+def build_snapshot(transactions, snapshot_file='transactions.snap'):
+    """
+    Write transactions to a binary snapshot file
+
+    Args:
+        transactions: List of transaction dictionaries
+        snapshot_file: Output path
+
+    Returns:
+        Output path
+    """
+    records = sorted(transactions, key=lambda t: t['id'])
+    encoded = [encode_record(t) for t in records]
+
+    data_offset = HEADER.size + INDEX_ENTRY.size * len(records)
+
+    with open(snapshot_file, 'wb') as f:
+        f.write(HEADER.pack(MAGIC, len(records), data_offset))
+
+        offset = data_offset
+        for transaction, record in zip(records, encoded):
+            f.write(INDEX_ENTRY.pack(transaction['id'], offset, len(record)))
+            offset += len(record) + len(RECORD_SEPARATOR)
+
+        f.write(RECORD_SEPARATOR.join(encoded))
+
+    return snapshot_file
+
+class Snapshot:
+    """
+    Read-only, memory-mapped view of a snapshot file
+
+    Lookups binary-search the fixed-width index inside the mapping, so no
+    per-record Python objects are created and memory use does not grow
+    with the dataset.
+    """
+
+    def __init__(self, snapshot_file):
+        self.file = open(snapshot_file, 'rb')
+        self.mm = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+
+        magic, self.count, self.data_offset = HEADER.unpack_from(self.mm, 0)
+        if magic != MAGIC:
+            self.close()
+            raise ValueError(f"{snapshot_file} is not a transaction snapshot")
+
+    def __len__(self):
+        return self.count
+
+    def __iter__(self):
+        """Decode transactions one at a time, in ID order"""
+        for i in range(self.count):
+            entry_id, offset, length = INDEX_ENTRY.unpack_from(self.mm, HEADER.size + i * INDEX_ENTRY.size)
+            yield json.loads(self.mm[offset:offset + length])
+
+    def find(self, transaction_id):
+        """
+        Binary search the index for a transaction ID
+
+        Returns:
+            Tuple (offset, length) if found, None otherwise
+        """
+        low, high = 0, self.count - 1
+
+        while low <= high:
+            mid = (low + high) // 2
+            entry_id, offset, length = INDEX_ENTRY.unpack_from(self.mm, HEADER.size + mid * INDEX_ENTRY.size)
+
+            if entry_id == transaction_id:
+                return offset, length
+            if entry_id < transaction_id:
+                low = mid + 1
+            else:
+                high = mid - 1
+
+        return None
+
+    def get_raw(self, transaction_id):
+        """
+        Return the encoded JSON of one transaction without copying it
+
+        Returns:
+            memoryview into the mapping if found, None otherwise
+        """
+        location = self.find(transaction_id)
+        if location is None:
+            return None
+
+        offset, length = location
+        return memoryview(self.mm)[offset:offset + length]
+
+    def get(self, transaction_id):
+        """Return one transaction decoded into a dictionary, or None"""
+        raw = self.get_raw(transaction_id)
+        return json.loads(bytes(raw)) if raw is not None else None
+
+    def all_raw(self):
+        """
+        Return every record as one contiguous, comma-separated JSON slice
+
+        Returns:
+            memoryview into the mapping
+        """
+        return memoryview(self.mm)[self.data_offset:]
+
+    def close(self):
+        """Unmap and close the snapshot file"""
+        self.mm.close()
+        self.file.close()
+
+# Example usage
+if __name__ == '__main__':
+    import sys
+    from xml_parser import parse_xml_to_json
+
+    xml_file = sys.argv[1] if len(sys.argv) > 1 else '../modified_sms_v2.xml'
+    snapshot_file = sys.argv[2] if len(sys.argv) > 2 else 'transactions.snap'
+
+    transactions = parse_xml_to_json(xml_file)
+    build_snapshot(transactions, snapshot_file)
+    print(f"Wrote {len(transactions)} transactions to {snapshot_file}")
+
+    snapshot = Snapshot(snapshot_file)
+    print(f"\nTransaction 1 from snapshot:")
+    print(bytes(snapshot.get_raw(1)).decode())
+    snapshot.close()
@@ -1,13 +1,76 @@
 import xml.etree.ElementTree as ET
 import json
 import re
+import csv
+import io
+import os
+import glob
+import hashlib
+import threading
 from datetime import datetime
 
-def parse_xml_to_json(xml_file):
+def parse_xml_to_json(xml_file, lazy=False):
     """
     Parse modified_sms_v2.xml and convert to JSON format
+    
+    A single path is parsed as-is (IDs follow file order). A list of paths,
+    or a glob pattern, is ingested with ingest_xml_files(): duplicates are
+    dropped and the result is ordered by timestamp.
+    
+    Args:
+        xml_file: Path to the XML backup, list of paths, or glob pattern
+        lazy: Only keep the raw attributes now and extract the other
+            fields from the body on first access (see LazyTransaction)
+    
     Returns: List of transaction dictionaries
     """
+    xml_files = expand_xml_files(xml_file)
+    if len(xml_files) == 1 and xml_files[0] == xml_file:
+        return parse_xml_file(xml_file, lazy)
+    
+    return ingest_xml_files(xml_files, lazy)['transactions']
+
+def expand_xml_files(xml_files):
+    """
+    Expand a path, glob pattern, or list of them into a list of paths
+    
+    Args:
+        xml_files: String or list of strings
+    
+    Returns:
+        List of paths, in the order given (glob matches sorted)
+    
+    Raises:
+        FileNotFoundError: If a pattern matches no files, or no paths are given
+    """
+    if isinstance(xml_files, str):
+        xml_files = [xml_files]
+    
+    paths = []
+    for pattern in xml_files:
+        if any(char in pattern for char in '*?['):
+            matches = sorted(glob.glob(pattern))
+            if not matches:
+                raise FileNotFoundError(f"No XML files match {pattern}")
+            paths.extend(matches)
+        else:
+            paths.append(pattern)
+    
+    if not paths:
+        raise FileNotFoundError("No XML files given")
+    
+    return paths
+
+def parse_xml_file(xml_file, lazy=False):
+    """
+    Parse one XML backup
+    
+    Args:
+        xml_file: Path to the XML backup
+        lazy: See parse_xml_to_json
+    
+    Returns: List of transaction dictionaries, IDs numbered from 1
+    """
     # Read and fix XML if needed
     with open(xml_file, 'r', encoding='utf-8') as f:
         xml_content = f.read()
@@ -23,6 +86,15 @@ def parse_xml_to_json(xml_file):
     for idx, sms in enumerate(root.findall('sms'), start=1):
         body = sms.get('body', '')
         
+        if lazy:
+            transactions.append(LazyTransaction(
+                id=idx,
+                date=sms.get('readable_date', ''),
+                timestamp=sms.get('date', ''),
+                body=body
+            ))
+            continue
+        
         # Extract transaction details from the body
         transaction = {
             'id': idx,
@@ -114,10 +186,317 @@ def extract_txid(body):
         return match.group(1)
     return ''
 
-def save_json(transactions, output_file='transactions.json'):
-    """Save transactions to JSON file"""
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(transactions, f, indent=2, ensure_ascii=False)
+# Fields derived from the message body, in the order they appear in a transaction
+FIELD_EXTRACTORS = {
+    'type': determine_transaction_type,
+    'amount': extract_amount,
+    'sender': extract_sender,
+    'receiver': extract_receiver,
+    'balance': extract_balance,
+    'fee': extract_fee,
+    'txid': extract_txid
+}
+
+# Serializes extraction so concurrent readers never see a half-materialized transaction
+EXTRACT_LOCK = threading.Lock()
+
+class LazyTransaction(dict):
+    """
+    Transaction dictionary whose derived fields are extracted on demand
+    
+    Only id, date, timestamp and body are stored at load time. Reading a
+    derived field with [] or get() extracts and memoizes just that field;
+    anything that needs the whole record (iteration, items(), json.dumps,
+    copying or any mutation) extracts every remaining field first, so the
+    result is identical to an eagerly parsed transaction.
+    """
+    
+    __slots__ = ('complete',)
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.complete = False
+    
+    def extract(self, key):
+        """Extract and memoize one derived field"""
+        # Memoized fields are read without the lock; only a miss takes it.
+        # A single lookup, since materialize() may pop and re-insert the key
+        # between a separate check and read.
+        try:
+            return dict.__getitem__(self, key)
+        except KeyError:
+            pass
+        
+        with EXTRACT_LOCK:
+            if dict.__contains__(self, key):
+                return dict.__getitem__(self, key)
+            value = FIELD_EXTRACTORS[key](dict.get(self, 'body', ''))
+            dict.__setitem__(self, key, value)
+            return value
+    
+    def materialize(self):
+        """Extract every missing field, keeping the usual key order"""
+        if self.complete:
+            return
+        
+        with EXTRACT_LOCK:
+            if self.complete:
+                return
+            for key in FIELD_EXTRACTORS:
+                value = dict.pop(self, key) if dict.__contains__(self, key) else FIELD_EXTRACTORS[key](dict.get(self, 'body', ''))
+                dict.__setitem__(self, key, value)
+            self.complete = True
+    
+    def __getitem__(self, key):
+        if not self.complete and key in FIELD_EXTRACTORS:
+            return self.extract(key)
+        return dict.__getitem__(self, key)
+    
+    def get(self, key, default=None):
+        if not self.complete and key in FIELD_EXTRACTORS:
+            return self.extract(key)
+        return dict.get(self, key, default)
+    
+    def __contains__(self, key):
+        return (not self.complete and key in FIELD_EXTRACTORS) or dict.__contains__(self, key)
+    
+    def __iter__(self):
+        self.materialize()
+        return dict.__iter__(self)
+    
+    def __len__(self):
+        self.materialize()
+        return dict.__len__(self)
+    
+    def __repr__(self):
+        self.materialize()
+        return dict.__repr__(self)
+    
+    def __eq__(self, other):
+        self.materialize()
+        if isinstance(other, LazyTransaction):
+            other.materialize()
+        return dict.__eq__(self, other)
+    
+    __hash__ = None
+    
+    def keys(self):
+        self.materialize()
+        return dict.keys(self)
+    
+    def values(self):
+        self.materialize()
+        return dict.values(self)
+    
+    def items(self):
+        self.materialize()
+        return dict.items(self)
+    
+    def copy(self):
+        self.materialize()
+        return dict(dict.items(self))
+    
+    def __setitem__(self, key, value):
+        self.materialize()
+        dict.__setitem__(self, key, value)
+    
+    def __delitem__(self, key):
+        self.materialize()
+        dict.__delitem__(self, key)
+    
+    def update(self, *args, **kwargs):
+        self.materialize()
+        dict.update(self, *args, **kwargs)
+    
+    def pop(self, *args):
+        self.materialize()
+        return dict.pop(self, *args)
+    
+    def popitem(self):
+        self.materialize()
+        return dict.popitem(self)
+    
+    def setdefault(self, key, default=None):
+        self.materialize()
+        return dict.setdefault(self, key, default)
+    
+    def __reduce__(self):
+        # Stay lazy when sent between processes
+        return (LazyTransaction, (dict(dict.items(self)),))
+
+def extract_fields(transactions, fields=None):
+    """
+    Force extraction of derived fields in bulk
+    Used by filters and indexes before they scan lazily loaded transactions
+    
+    Args:
+        transactions: List of transaction dictionaries
+        fields: Derived field names to extract, or None for all of them
+    """
+    for transaction in transactions:
+        if not isinstance(transaction, LazyTransaction) or transaction.complete:
+            continue
+        if fields is None:
+            transaction.materialize()
+        else:
+            for field in fields:
+                transaction.get(field)
+
+def dedup_key(transaction):
+    """
+    Identity of an M-Money message across overlapping backups
+    
+    Returns:
+        ('txid', txid) when the body carries a transaction ID, otherwise
+        ('content', hash of timestamp and body)
+    """
+    txid = transaction.get('txid')
+    if txid:
+        return ('txid', txid)
+    
+    content = f"{transaction.get('timestamp', '')}\0{transaction.get('body', '')}"
+    return ('content', hashlib.sha1(content.encode('utf-8')).digest())
+
+def timestamp_key(transaction):
+    """Sort key: the SMS timestamp in milliseconds (0 if missing)"""
+    timestamp = transaction.get('timestamp', '')
+    return int(timestamp) if timestamp.isdigit() else 0
+
+def ingest_xml_files(xml_files, lazy=False, max_workers=None):
+    """
+    Parse several XML backups in parallel and merge them without duplicates
+    
+    Files are parsed in separate processes. They are started with the
+    'forkserver' method (or 'spawn' where that is unavailable), never by
+    forking the caller, which may be a server with running threads.
+    Messages are then merged
+    through a hash index keyed by txid, falling back to a hash of
+    timestamp and body for messages without one; the first occurrence
+    (in file order) is kept. The result is sorted by timestamp, ties
+    keeping file order, and renumbered from 1, so the same inputs always
+    produce the same IDs.
+    
+    Args:
+        xml_files: Path, glob pattern, or list of them
+        lazy: See parse_xml_to_json (only txid is extracted up front)
+        max_workers: Parser processes (defaults to one per file, up to CPU count)
+    
+    Returns:
+        Dictionary with the transactions and ingest counts
+    """
+    # Imported here: they are slow to import and only needed when merging backups
+    import multiprocessing
+    from concurrent.futures import ProcessPoolExecutor
+    
+    paths = expand_xml_files(xml_files)
+    
+    if len(paths) > 1:
+        workers = max_workers or min(len(paths), os.cpu_count() or 1)
+        # Workers import this module and call the module-level parse_xml_file
+        start_method = 'forkserver' if 'forkserver' in multiprocessing.get_all_start_methods() else 'spawn'
+        with ProcessPoolExecutor(max_workers=workers, mp_context=multiprocessing.get_context(start_method)) as executor:
+            parsed = list(executor.map(parse_xml_file, paths, [lazy] * len(paths)))
+    else:
+        parsed = [parse_xml_file(path, lazy) for path in paths]
+    
+    index = {}
+    duplicates_by_txid = 0
+    duplicates_by_content = 0
+    
+    for transactions in parsed:
+        for transaction in transactions:
+            key = dedup_key(transaction)
+            if key in index:
+                if key[0] == 'txid':
+                    duplicates_by_txid += 1
+                else:
+                    duplicates_by_content += 1
+                continue
+            index[key] = transaction
+    
+    merged = sorted(index.values(), key=timestamp_key)
+    for new_id, transaction in enumerate(merged, start=1):
+        # dict.__setitem__ keeps lazily loaded transactions lazy
+        dict.__setitem__(transaction, 'id', new_id)
+    
+    return {
+        'transactions': merged,
+        'files': len(paths),
+        'parsed': sum(len(transactions) for transactions in parsed),
+        'duplicates_dropped': duplicates_by_txid + duplicates_by_content,
+        'duplicates_by_txid': duplicates_by_txid,
+        'duplicates_by_content': duplicates_by_content
+    }
+
+# Column order for CSV export
+CSV_FIELDS = ['id', 'date', 'timestamp', 'body'] + list(FIELD_EXTRACTORS)
+
+def iter_ndjson(transactions):
+    """
+    Encode transactions as newline-delimited JSON, one line at a time
+    
+    Args:
+        transactions: Any iterable of transaction dictionaries
+    
+    Yields:
+        One JSON line (with trailing newline) per transaction
+    """
+    for transaction in transactions:
+        yield json.dumps(transaction, ensure_ascii=False) + '\n'
+
+def iter_csv(transactions):
+    """
+    Encode transactions as CSV, one line at a time
+    Fields outside CSV_FIELDS are left out
+    
+    Args:
+        transactions: Any iterable of transaction dictionaries
+    
+    Yields:
+        The header line, then one line per transaction
+    """
+    buffer = io.StringIO()
+    writer = csv.DictWriter(buffer, fieldnames=CSV_FIELDS, extrasaction='ignore')
+    
+    writer.writeheader()
+    for transaction in transactions:
+        writer.writerow(transaction)
+        yield buffer.getvalue()
+        buffer.seek(0)
+        buffer.truncate()
+    
+    if buffer.tell():
+        yield buffer.getvalue()
+
+# Streaming encoders by output format
+EXPORT_ENCODERS = {
+    'ndjson': iter_ndjson,
+    'csv': iter_csv
+}
+
+def save_json(transactions, output_file='transactions.json', output_format='json'):
+    """
+    Save transactions to a file
+    
+    Args:
+        transactions: List of transactions, or any iterable for ndjson/csv
+        output_file: Output path
+        output_format: 'json' (pretty-printed array), or 'ndjson'/'csv',
+            which are streamed line by line with constant memory
+    
+    Returns:
+        Output path
+    """
+    if output_format == 'json':
+        with open(output_file, 'w', encoding='utf-8') as f:
+            json.dump(transactions, f, indent=2, ensure_ascii=False)
+        return output_file
+    
+    if output_format not in EXPORT_ENCODERS:
+        raise ValueError(f"Unsupported output format: {output_format}")
+    
+    with open(output_file, 'w', encoding='utf-8', newline='') as f:
+        f.writelines(EXPORT_ENCODERS[output_format](transactions))
     return output_file
 
 # Example usage
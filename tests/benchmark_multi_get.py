@@ -0,0 +1,116 @@
+#!/usr/bin/env python3
+"""
+Multi-get benchmark
+
+Compares fetching N transactions with N single GET /transactions/{id}
+requests against one GET /transactions?ids=... and one POST
+/transactions/lookup. Run it against a running server:
+
+    RATE_LIMITS="admin=100000:100000" python api/server.py
+    python tests/benchmark_multi_get.py --count 50
+"""
+import argparse
+import base64
+import json
+import time
+import urllib.error
+import urllib.request
+
+def request(base_url, auth, path, body=None):
+    """
+    Send one request
+
+    Returns:
+        Tuple (status, response bytes)
+    """
+    data = json.dumps(body).encode() if body is not None else None
+    req = urllib.request.Request(base_url + path, data=data, method='POST' if data else 'GET')
+    req.add_header('Authorization', f"Basic {auth}")
+
+    try:
+        with urllib.request.urlopen(req) as response:
+            return response.status, response.read()
+    except urllib.error.HTTPError as e:
+        return e.code, e.read()
+
+def benchmark_multi_get(base_url, auth, ids, repeat=5):
+    """
+    Time N single requests against one multi-get request
+
+    Args:
+        base_url: Server URL, e.g. http://localhost:8000
+        auth: Base64-encoded username:password
+        ids: Transaction IDs to fetch
+        repeat: Number of rounds (the best round is reported)
+
+    Returns:
+        Dictionary with the time and bytes of each approach
+    """
+    def measure(fetch):
+        best = None
+        for _ in range(repeat):
+            start = time.perf_counter()
+            size, records = fetch()
+            elapsed = time.perf_counter() - start
+            best = elapsed if best is None else min(best, elapsed)
+        return best, size, records
+
+    def single():
+        size = 0
+        records = []
+        for tid in ids:
+            status, body = request(base_url, auth, f"/transactions/{tid}")
+            if status == 429:
+                raise RuntimeError("Rate limited - start the server with a higher RATE_LIMITS for this user")
+            size += len(body)
+            if status == 200:
+                records.append(json.loads(body)['data'])
+        return size, records
+
+    def multi_get():
+        status, body = request(base_url, auth, f"/transactions?ids={','.join(str(tid) for tid in ids)}")
+        if status != 200:
+            raise RuntimeError(f"Multi-get failed with {status}: {body.decode()}")
+        return len(body), json.loads(body)['data']
+
+    def lookup():
+        status, body = request(base_url, auth, "/transactions/lookup", {'ids': ids})
+        if status != 200:
+            raise RuntimeError(f"Lookup failed with {status}: {body.decode()}")
+        return len(body), json.loads(body)['data']
+
+    single_time, single_bytes, single_records = measure(single)
+    multi_time, multi_bytes, multi_records = measure(multi_get)
+    lookup_time, lookup_bytes, lookup_records = measure(lookup)
+
+    return {
+        'count': len(ids),
+        'found': len(multi_records),
+        'same_records': single_records == multi_records == lookup_records,
+        'single_time': single_time,
+        'single_bytes': single_bytes,
+        'multi_get_time': multi_time,
+        'multi_get_bytes': multi_bytes,
+        'lookup_time': lookup_time,
+        'lookup_bytes': lookup_bytes,
+        'speedup': single_time / multi_time if multi_time > 0 else float('inf')
+    }
+
+# Example usage
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Multi-get vs single GET benchmark')
+    parser.add_argument('--url', default='http://localhost:8000', help='Server URL')
+    parser.add_argument('--user', default='admin:password123', help='username:password')
+    parser.add_argument('--count', type=int, default=20, help='Number of IDs to fetch')
+    parser.add_argument('--repeat', type=int, default=5, help='Rounds per approach')
+    args = parser.parse_args()
+
+    auth = base64.b64encode(args.user.encode()).decode()
+    results = benchmark_multi_get(args.url, auth, list(range(1, args.count + 1)), args.repeat)
+
+    print(f"Multi-get benchmark ({results['count']} IDs, {results['found']} found)")
+    print(f"{results['count']} single requests: {results['single_time']:.6f} seconds, {results['single_bytes']} bytes")
+    print(f"GET ?ids=: {results['multi_get_time']:.6f} seconds, {results['multi_get_bytes']} bytes")
+    print(f"POST /transactions/lookup: {results['lookup_time']:.6f} seconds, {results['lookup_bytes']} bytes")
+    print(f"Same records: {results['same_records']}")
+    print(f"Speedup: {results['speedup']:.2f}x faster")
@@ -2,6 +2,9 @@
 
 # Transaction API Test Script
 # Tests all endpoints with valid and invalid credentials
+#
+# Start the server with MAX_IN_FLIGHT=2 to see Test 17 shed requests with 503:
+#   MAX_IN_FLIGHT=2 python api/server.py
 
 BASE_URL="http://localhost:8000"
 VALID_AUTH="admin:password123"
@@ -119,6 +122,147 @@ echo "------------------------------------------"
 curl -s -X GET "$BASE_URL/transactions" -u "$VALID_AUTH" | python -m json.tool | head -30
 echo ""
 
+# Test 13: Multi-get (10 was deleted above, 999 never existed)
+echo "Test 13: GET /transactions?ids=1,5,10,999 (Multi-get)"
+echo "----------------------------------------------------"
+curl -s -X GET "$BASE_URL/transactions?ids=1,5,10,999&fields=id,type,amount" -u "$VALID_AUTH" | python -m json.tool
+echo ""
+echo ""
+
+# Test 14: Multi-get with the IDs in the body
+echo "Test 14: POST /transactions/lookup (Multi-get)"
+echo "---------------------------------------------"
+curl -s -X POST "$BASE_URL/transactions/lookup" \
+  -u "$VALID_AUTH" \
+  -H "Content-Type: application/json" \
+  -d '{"ids": [2, 3, 999], "fields": ["id", "type"]}' | python -m json.tool
+echo ""
+echo ""
+
+# Test 15: Admission counters
+echo "Test 15: GET /metrics (Admin)"
+echo "----------------------------"
+curl -s -X GET "$BASE_URL/metrics" -u "$VALID_AUTH" | python -m json.tool
+echo ""
+echo ""
+
+# Test 16: Rate limiting - "test" has a burst of 20, so the last requests
+# get 429 with Retry-After (with --workers the burst is split between them)
+echo "Test 16: 30 x GET /transactions/1 as test (Some 429 + Retry-After)"
+echo "-----------------------------------------------------------------"
+for i in $(seq 1 30); do
+  curl -s -D - -o /dev/null -X GET "$BASE_URL/transactions/1" -u "test:test123"
+done | grep -iE "^(HTTP|Retry-After)" | tr -d '\r' | sort | uniq -c
+echo ""
+
+# Test 17: Overload shedding - requests beyond MAX_IN_FLIGHT get 503 with
+# Retry-After. Start the server with MAX_IN_FLIGHT=2 to see them; with the
+# default of 64 all of these are admitted.
+echo "Test 17: 50 concurrent GET /transactions/export (503 + Retry-After over MAX_IN_FLIGHT)"
+echo "--------------------------------------------------------------------------------------"
+seq 1 50 | xargs -P 50 -I {} \
+  curl -s -D - -o /dev/null -X GET "$BASE_URL/transactions/export?format=csv" -u "$VALID_AUTH" \
+  | grep -iE "^(HTTP|Retry-After)" | tr -d '\r' | sort | uniq -c
+echo ""
+
+# Test 18: Shedding and rate limiting show up in the counters
+echo "Test 18: GET /metrics (After Tests 16-17)"
+echo "----------------------------------------"
+curl -s -X GET "$BASE_URL/metrics" -u "$VALID_AUTH" | python -m json.tool
+echo ""
+echo ""
+
+# Test 19: Streaming export as NDJSON
+echo "Test 19: GET /transactions/export?format=ndjson"
+echo "----------------------------------------------"
+curl -s -X GET "$BASE_URL/transactions/export?format=ndjson" -u "$VALID_AUTH" | head -3
+echo ""
+
+# Test 20: Streaming export as CSV
+echo "Test 20: GET /transactions/export?format=csv"
+echo "-------------------------------------------"
+curl -s -X GET "$BASE_URL/transactions/export?format=csv" -u "$VALID_AUTH" | head -4
+echo ""
+
+# Test 21: Unsupported export format (should fail)
+echo "Test 21: GET /transactions/export?format=xml (Should Fail)"
+echo "---------------------------------------------------------"
+curl -s -X GET "$BASE_URL/transactions/export?format=xml" -u "$VALID_AUTH" | python -m json.tool
+echo ""
+echo ""
+
+# Test 22: Sparse fieldset on the list endpoint
+echo "Test 22: GET /transactions?fields=id,amount"
+echo "------------------------------------------"
+curl -s -X GET "$BASE_URL/transactions?fields=id,amount" -u "$VALID_AUTH" | python -m json.tool | head -20
+echo ""
+echo ""
+
+# Test 23: Sparse fieldset on a single transaction
+echo "Test 23: GET /transactions/5?fields=id,type,amount"
+echo "-------------------------------------------------"
+curl -s -X GET "$BASE_URL/transactions/5?fields=id,type,amount" -u "$VALID_AUTH" | python -m json.tool
+echo ""
+echo ""
+
+# Test 24: Open a profiling window (501 when the server runs with --workers)
+echo "Test 24: POST /admin/profile (Admin)"
+echo "-----------------------------------"
+curl -s -X POST "$BASE_URL/admin/profile" \
+  -u "$VALID_AUTH" \
+  -H "Content-Type: application/json" \
+  -d '{"seconds": 30, "route": "GET /transactions"}' | python -m json.tool
+echo ""
+echo ""
+
+# Test 25: Profile a few requests, then read the report
+echo "Test 25: GET /admin/profile?limit=5 (Admin)"
+echo "------------------------------------------"
+for i in 1 2 3; do
+  curl -s -o /dev/null -X GET "$BASE_URL/transactions" -u "$VALID_AUTH"
+done
+curl -s -X GET "$BASE_URL/admin/profile?limit=5" -u "$VALID_AUTH" | python -m json.tool | head -40
+echo ""
+echo ""
+
+# Test 26: Close the profiling window
+echo "Test 26: DELETE /admin/profile (Admin)"
+echo "-------------------------------------"
+curl -s -X DELETE "$BASE_URL/admin/profile" -u "$VALID_AUTH" | python -m json.tool | head -20
+echo ""
+echo ""
+
+# Test 27: Profiling with a body that is not a JSON object (should fail)
+echo "Test 27: POST /admin/profile (Invalid Body - Should Fail)"
+echo "--------------------------------------------------------"
+curl -s -X POST "$BASE_URL/admin/profile" \
+  -u "$VALID_AUTH" \
+  -H "Content-Type: application/json" \
+  -d '[30]' | python -m json.tool
+echo ""
+echo ""
+
+# Test 28: Profiling as a non-admin user (should fail)
+echo "Test 28: GET /admin/profile (Non-Admin - Should Fail)"
+echo "----------------------------------------------------"
+curl -s -X GET "$BASE_URL/admin/profile" -u "user:user123" | python -m json.tool
+echo ""
+echo ""
+
+# Test 29: Liveness probe (no auth)
+echo "Test 29: GET /healthz (No Auth)"
+echo "-------------------------------"
+curl -s -X GET "$BASE_URL/healthz" | python -m json.tool
+echo ""
+echo ""
+
+# Test 30: Readiness probe (no auth)
+echo "Test 30: GET /readyz (No Auth)"
+echo "------------------------------"
+curl -s -X GET "$BASE_URL/readyz" | python -m json.tool
+echo ""
+echo ""
+
 echo "=================================================="
 echo "Test Suite Completed"
 echo "=================================================="
\ No newline at end of file
@@ -0,0 +1,175 @@
+#!/usr/bin/env python3
+"""
+End-to-end tests for pre-fork mode
+
+Starts api/server.py --workers 2 on a free port and checks that writes
+forwarded to the owner process reach every worker, in memory and with
+SQLite storage:
+
+    python -m unittest tests/test_prefork.py
+"""
+import base64
+import http.client
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import tempfile
+import time
+import unittest
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+SERVER = os.path.join(ROOT, 'api', 'server.py')
+
+WORKERS = 2
+
+# Consecutive matching GETs (new connection each) before a write counts as
+# visible everywhere; connections are spread over the workers by the kernel
+CONFIRMATIONS = 12
+
+AUTH = 'Basic ' + base64.b64encode(b'admin:password123').decode()
+
+def free_port():
+    """A port nothing is listening on right now"""
+    with socket.socket() as sock:
+        sock.bind(('localhost', 0))
+        return sock.getsockname()[1]
+
+@unittest.skipUnless(hasattr(os, 'fork') and hasattr(socket, 'SO_REUSEPORT'), 'pre-fork mode needs fork and SO_REUSEPORT')
+class PreforkTests:
+    """Tests shared by both storage modes; subclasses provide server_env()"""
+
+    def setUp(self):
+        self.port = free_port()
+        env = {**os.environ, 'RATE_LIMITS': 'admin=100000:100000', **self.server_env()}
+        self.output = tempfile.TemporaryFile()
+        self.owner = subprocess.Popen(
+            [sys.executable, SERVER, '--port', str(self.port), '--workers', str(WORKERS)],
+            env=env, stdout=self.output, stderr=subprocess.STDOUT
+        )
+        self.addCleanup(self.stop_server)
+        self.worker_pids = self.wait_for_workers()
+
+    def stop_server(self):
+        if self.owner.poll() is None:
+            self.owner.send_signal(signal.SIGTERM)
+            try:
+                self.owner.wait(10)
+            except subprocess.TimeoutExpired:
+                self.owner.kill()
+                self.owner.wait()
+        self.output.close()
+
+    def server_log(self):
+        self.output.seek(0)
+        return self.output.read().decode(errors='replace')
+
+    def request(self, method, path, body=None):
+        """
+        Send one request on a new connection
+
+        Returns:
+            Tuple (status, parsed JSON body)
+        """
+        conn = http.client.HTTPConnection('localhost', self.port, timeout=10)
+        try:
+            data = json.dumps(body) if body is not None else None
+            conn.request(method, path, body=data, headers={'Authorization': AUTH})
+            response = conn.getresponse()
+            return response.status, json.loads(response.read())
+        finally:
+            conn.close()
+
+    def wait_for_workers(self, timeout=30):
+        """
+        Wait until the owner has handed the port over to the workers
+
+        Returns:
+            Set of worker pids seen on /metrics
+        """
+        deadline = time.monotonic() + timeout
+        pids = set()
+        streak = 0
+
+        while time.monotonic() < deadline:
+            self.assertIsNone(self.owner.poll(), self.server_log())
+            try:
+                status, response = self.request('GET', '/metrics')
+            except (ConnectionError, OSError):
+                time.sleep(0.1)
+                continue
+
+            pid = response['data']['pid']
+            if status == 200 and pid != self.owner.pid:
+                pids.add(pid)
+                streak += 1
+            else:
+                streak = 0
+
+            # The owner keeps answering until its queued connections are drained
+            if streak >= CONFIRMATIONS and len(pids) == WORKERS:
+                return pids
+            time.sleep(0.05)
+
+        self.fail(f"Workers never took over the port (saw {pids})\n{self.server_log()}")
+
+    def assert_everywhere(self, path, expected_status, check=lambda data: True, timeout=5):
+        """
+        Assert that every worker answers GET path the same way
+
+        Workers apply replicated writes in the background, so a worker other
+        than the one that took the write may lag briefly.
+        """
+        deadline = time.monotonic() + timeout
+        streak = 0
+
+        while streak < CONFIRMATIONS:
+            status, response = self.request('GET', path)
+            if status == expected_status and check(response.get('data')):
+                streak += 1
+                continue
+
+            streak = 0
+            if time.monotonic() > deadline:
+                self.fail(f"GET {path} returned {status} {response}, expected {expected_status}")
+            time.sleep(0.05)
+
+    def test_writes_reach_every_worker(self):
+        status, response = self.request('POST', '/transactions', {
+            'type': 'payment', 'amount': '5000', 'sender': 'A', 'receiver': 'B'
+        })
+        self.assertEqual(status, 201, response)
+        transaction_id = response['data']['id']
+        path = f"/transactions/{transaction_id}"
+        self.assert_everywhere(path, 200, lambda data: data['amount'] == '5000')
+
+        status, response = self.request('PUT', path, {'amount': '7500'})
+        self.assertEqual(status, 200, response)
+        self.assert_everywhere(path, 200, lambda data: data['amount'] == '7500')
+
+        status, response = self.request('DELETE', path)
+        self.assertEqual(status, 200, response)
+        self.assert_everywhere(path, 404)
+
+        # Failed writes are answered by the owner too, and must not kill it
+        status, response = self.request('PUT', path, {'amount': '1'})
+        self.assertEqual(status, 404, response)
+
+        self.assertIsNone(self.owner.poll(), self.server_log())
+        self.assertEqual(self.wait_for_workers(), self.worker_pids)
+        self.assertNotIn('Traceback', self.server_log())
+
+class MemoryPreforkTests(PreforkTests, unittest.TestCase):
+    def server_env(self):
+        return {}
+
+class SQLitePreforkTests(PreforkTests, unittest.TestCase):
+    def server_env(self):
+        directory = tempfile.TemporaryDirectory()
+        self.addCleanup(directory.cleanup)
+        return {'TRANSACTIONS_DB': os.path.join(directory.name, 'test.db')}
+
+if __name__ == '__main__':
+    unittest.main()
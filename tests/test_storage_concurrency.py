@@ -0,0 +1,156 @@
+#!/usr/bin/env python3
+"""
+Concurrency tests for the storage backends
+
+Runs create/update/delete/get_many from many threads at once, the way
+ThreadingHTTPServer does (one new thread per request), against both the
+in-memory and the SQLite backend. No server is needed:
+
+    python -m unittest tests/test_storage_concurrency.py
+"""
+import os
+import sys
+import tempfile
+import threading
+import unittest
+
+# Add parent directory to path for imports
+sys.path.append(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from api.storage import MemoryStorage, SQLiteStorage
+
+THREADS = 16
+WRITES_PER_THREAD = 25
+
+def sample_transactions(count):
+    """Transactions with IDs 1..count"""
+    return [
+        {'id': i, 'type': 'payment', 'amount': str(i), 'sender': 'A', 'receiver': 'B', 'timestamp': str(i)}
+        for i in range(1, count + 1)
+    ]
+
+def run_threads(target, count=THREADS):
+    """Run target(index) on `count` new threads at once and re-raise the first error"""
+    errors = []
+    barrier = threading.Barrier(count)
+
+    def run(index):
+        try:
+            barrier.wait()
+            target(index)
+        except Exception as e:
+            errors.append(e)
+
+    threads = [threading.Thread(target=run, args=(i,)) for i in range(count)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        raise errors[0]
+
+class ConcurrencyTests:
+    """Tests shared by both backends; subclasses provide make_storage()"""
+
+    def test_concurrent_creates_get_unique_ids(self):
+        storage = self.make_storage(sample_transactions(10))
+        created = []
+        lock = threading.Lock()
+
+        def create(index):
+            for n in range(WRITES_PER_THREAD):
+                transaction = storage.create({'type': 'payment', 'amount': f"{index}-{n}", 'sender': 'A', 'receiver': 'B'})
+                with lock:
+                    created.append(transaction['id'])
+
+        run_threads(create)
+
+        self.assertEqual(len(created), THREADS * WRITES_PER_THREAD)
+        self.assertEqual(len(set(created)), len(created))
+        self.assertEqual(len(storage), 10 + len(created))
+        self.assertEqual(sorted(created), list(range(11, 11 + len(created))))
+
+    def test_concurrent_updates_are_not_lost(self):
+        storage = self.make_storage(sample_transactions(10))
+
+        def update(index):
+            # Every thread sets its own field on the same transaction
+            for n in range(WRITES_PER_THREAD):
+                self.assertIsNotNone(storage.update(1, {f"field_{index}": n}))
+
+        run_threads(update)
+
+        transaction = storage.get(1)
+        for index in range(THREADS):
+            self.assertEqual(transaction[f"field_{index}"], WRITES_PER_THREAD - 1)
+        self.assertEqual(transaction['amount'], '1')
+
+    def test_concurrent_deletes_succeed_once(self):
+        count = THREADS * 4
+        storage = self.make_storage(sample_transactions(count))
+        deleted = []
+        lock = threading.Lock()
+
+        def delete(index):
+            # Every thread tries to delete every ID
+            for transaction_id in range(1, count + 1):
+                if storage.delete(transaction_id):
+                    with lock:
+                        deleted.append(transaction_id)
+
+        run_threads(delete)
+
+        self.assertEqual(sorted(deleted), list(range(1, count + 1)))
+        self.assertEqual(len(storage), 0)
+        self.assertEqual(storage.get_many([1, 2, 3]), [None, None, None])
+
+    def test_get_many_during_writes(self):
+        storage = self.make_storage(sample_transactions(100))
+        ids = list(range(1, 101))
+
+        def work(index):
+            for n in range(WRITES_PER_THREAD):
+                if index % 2:
+                    transaction = storage.create({'type': 'payment', 'amount': '1', 'sender': 'A', 'receiver': 'B'})
+                    storage.update(transaction['id'], {'amount': '2'})
+                    storage.delete(transaction['id'])
+                else:
+                    found = storage.get_many(ids)
+                    self.assertEqual([t['id'] for t in found], ids)
+
+        run_threads(work)
+
+        self.assertEqual(len(storage), 100)
+
+class MemoryStorageTests(ConcurrencyTests, unittest.TestCase):
+    def make_storage(self, transactions):
+        return MemoryStorage(transactions)
+
+class SQLiteStorageTests(ConcurrencyTests, unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.storages = []
+
+    def tearDown(self):
+        for storage in self.storages:
+            storage.close()
+        self.directory.cleanup()
+
+    def make_storage(self, transactions):
+        storage = SQLiteStorage(os.path.join(self.directory.name, 'test.db'))
+        storage.load(transactions)
+        self.storages.append(storage)
+        return storage
+
+    def test_connections_are_bounded(self):
+        storage = self.make_storage(sample_transactions(10))
+
+        # One short-lived thread per request, as with ThreadingHTTPServer
+        for _ in range(5):
+            run_threads(lambda index: storage.get(1))
+
+        self.assertLessEqual(len(storage.opened), storage.pool_size)
+
+if __name__ == '__main__':
+    unittest.main()